@@ -1,16 +1,48 @@
-import streamlit as st
-from PIL import Image
+import io
+import os
+import threading
 from pathlib import Path
 
+import streamlit as st
+
+# Ancho del logo en la portada
+LOGO_WIDTH = 150
+
 def get_project_root() -> Path:
     """Returns the project root folder."""
     return Path(__file__).parent
 
-def load_image(image_name: str) -> Image:
-    """Loads an image from the specified path."""
-    image_path = Path(get_project_root()) / f"assets/{image_name}"
-    print(f"Trying to load image from: {image_path}")  # Agrega esto para depurar
-    return Image.open(image_path)
+# Logo ya reducido al ancho de la portada y codificado como JPEG, una vez por proceso: en cada ejecución
+# Streamlit sirve los bytes tal cual, sin volver a decodificar ni reducir la imagen
+@st.cache_resource(show_spinner=False)
+def load_image(image_name: str, width: int = LOGO_WIDTH) -> bytes:
+    """Returns the JPEG bytes of an asset, resized to `width` pixels."""
+    from PIL import Image
+
+    image = Image.open(get_project_root() / "assets" / image_name)
+    if image.width > width:
+        image = image.resize((width, round(image.height * width / image.width)), resample=Image.BILINEAR)
+    output = io.BytesIO()
+    image.convert("RGB").save(output, format="JPEG", quality=90)
+    return output.getvalue()
+
+def warm_up_data():
+    """Imports the pipeline and builds the current data version of every page."""
+    from pipeline import precalentar
+
+    precalentar()
+
+# Precalentar los datos en un hilo, una vez por proceso y después de dibujar la portada: las páginas encuentran
+# su versión ya construida (o en construcción), y el pipeline, pandas y plotly no se importan antes de la
+# primera vista. El hilo no lleva el contexto de la sesión que lo inició: sus cachés y errores son del proceso.
+# BUDGET_MONITOR_PRECALENTAR=0 lo desactiva
+@st.cache_resource(show_spinner=False)
+def start_warm_up():
+    if os.environ.get("BUDGET_MONITOR_PRECALENTAR", "1").lower() in ("0", "false", "no"):
+        return None
+    thread = threading.Thread(target=warm_up_data, name="precalentar-datos", daemon=True)
+    thread.start()
+    return thread
 
 # Configuración de la aplicación
 st.set_page_config(
@@ -22,7 +54,7 @@ st.set_page_config(
 # Crear tres columnas y mostrar la imagen en la columna central
 col1, col2, col3 = st.columns([1, 2, 1])
 with col2:
-    st.image(load_image("Logo.jpg"), width=150)
+    st.image(load_image("Logo.jpg"), width=LOGO_WIDTH, output_format="JPEG")
 
 # Títulos y subtítulos
 st.write("### MONITOR DE GESTION PRESUPUESTARIA :chart_with_upwards_trend:")
@@ -52,3 +84,6 @@ En ambos módulos cuentas con filtros dinámicos para poder ajustar las vistas d
 :moneybag::moneybag::moneybag::moneybag::moneybag::moneybag::moneybag::moneybag::moneybag::moneybag::moneybag::moneybag::moneybag::moneybag::moneybag::moneybag::moneybag:
     """
 )
+
+# Con la portada ya dibujada, precalentar los datos de las páginas en segundo plano
+start_warm_up()
@@ -0,0 +1 @@
+"""Benchmarks del pipeline sobre datos sintéticos (no requieren acceso a S3)."""
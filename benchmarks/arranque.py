@@ -0,0 +1,111 @@
+"""Arranque en frío de la portada (App.py): tiempo de importación de cada librería y de la primera vista.
+
+Uso:
+    python -m benchmarks.arranque --filas 100000
+    python -m benchmarks.arranque --datos datos_sinteticos/ --sin-precalentar
+
+Cada medición corre en un proceso nuevo, como tras un despliegue:
+- importación: `python -X importtime` de cada módulo por separado (tiempo acumulado, incluidas sus dependencias)
+- portada: primera y segunda ejecución de App.py con AppTest, sin contar la importación de streamlit
+- precalentado: segundos hasta que el hilo de la portada deja listos los datos de ambas páginas
+- páginas: primera ejecución de cada página después de la portada (con los datos ya precalentados, o
+  construyéndolos si se pasa --sin-precalentar)
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.sesiones import PAGINAS, RAIZ
+
+MODULOS = ['streamlit', 'PIL.Image', 'pandas', 'plotly.express', 'pyarrow', 'pipeline']
+
+# Script del proceso que abre la portada y después las páginas; escribe sus tiempos como JSON en stdout
+_PORTADA = """
+import json, sys, threading, time
+from streamlit.testing.v1 import AppTest
+
+tiempos = {}
+portada = AppTest.from_file(sys.argv[1], default_timeout=900)
+for ejecucion in ('portada_ms', 'portada_segunda_ms'):
+    inicio = time.perf_counter()
+    portada.run()
+    tiempos[ejecucion] = (time.perf_counter() - inicio) * 1000
+tiempos['errores'] = len(portada.exception)
+
+inicio = time.perf_counter()
+for hilo in threading.enumerate():
+    if hilo.name == 'precalentar-datos':
+        hilo.join()
+tiempos['precalentado_s'] = time.perf_counter() - inicio
+
+for pagina in sys.argv[2:]:
+    sesion = AppTest.from_file(pagina, default_timeout=900)
+    inicio = time.perf_counter()
+    sesion.run()
+    tiempos[pagina.rsplit('/', 1)[-1] + '_ms'] = (time.perf_counter() - inicio) * 1000
+    tiempos['errores'] += len(sesion.exception)
+print(json.dumps(tiempos))
+"""
+
+
+# Tiempo acumulado (ms) de importar `modulo` en un intérprete nuevo, según -X importtime
+def tiempo_importacion(modulo):
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+        cwd=RAIZ, capture_output=True, text=True, check=True,
+    )
+    for linea in reversed(proceso.stderr.splitlines()):
+        partes = linea.split('|')
+        if len(partes) == 3 and partes[2].strip() == modulo:
+            return int(partes[1]) / 1000
+    raise ValueError(f"-X importtime no informó {modulo}")
+
+
+def medir_portada(paginas=PAGINAS, precalentar=True):
+    """Tiempos (ms) de la portada y de la primera ejecución de cada página, en un proceso nuevo."""
+    entorno = {**os.environ, 'BUDGET_MONITOR_PRECALENTAR': '1' if precalentar else '0'}
+    proceso = subprocess.run(
+        [sys.executable, '-c', _PORTADA, str(RAIZ / 'App.py'), *(str(RAIZ / pagina) for pagina in paginas)],
+        cwd=RAIZ, env=entorno, capture_output=True, text=True, check=True,
+    )
+    return json.loads(proceso.stdout.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filas', type=int, default=100_000, help="filas de gasto sintético (si no se da --datos)")
+    parser.add_argument('--datos', help="directorio con los archivos de las fuentes (nombres de producción)")
+    parser.add_argument('--modulos', nargs='+', default=MODULOS)
+    parser.add_argument('--paginas', nargs='+', default=PAGINAS)
+    parser.add_argument('--sin-precalentar', action='store_true', help="abrir las páginas sin precalentar los datos")
+    parser.add_argument('--salida', default=f"benchmarks/resultados/arranque_{datetime.now():%Y%m%d_%H%M%S}.json")
+    argumentos = parser.parse_args()
+
+    datos = argumentos.datos
+    if datos is None:
+        from benchmarks.sintetico import escribir
+
+        datos = tempfile.mkdtemp(prefix='budget_monitor_')
+        escribir(datos, argumentos.filas)
+    os.environ['BUDGET_MONITOR_DIR_DATOS'] = str(Path(datos).resolve())
+
+    from benchmarks.etapas import entorno
+
+    reporte = {'entorno': entorno(), 'datos': str(datos), 'importacion_ms': {}}
+    for modulo in argumentos.modulos:
+        reporte['importacion_ms'][modulo] = tiempo_importacion(modulo)
+        print(f"import {modulo}: {reporte['importacion_ms'][modulo]:.0f} ms")
+
+    reporte['portada'] = medir_portada(argumentos.paginas, not argumentos.sin_precalentar)
+    for nombre, valor in reporte['portada'].items():
+        print(f"{nombre}: {valor:.2f}" if isinstance(valor, float) else f"{nombre}: {valor}")
+
+    salida = Path(argumentos.salida)
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    salida.write_text(json.dumps(reporte, indent=2, default=float))
+    print(f"Resultados en {salida}")
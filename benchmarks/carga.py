@@ -0,0 +1,150 @@
+"""Prueba de carga de las páginas de Gasto y Órdenes con sesiones concurrentes simuladas.
+
+Uso:
+    python -m benchmarks.carga --filas 100000 --sesiones 1 4 16 --interacciones 20
+    python -m benchmarks.carga --datos datos_sinteticos/ --paginas pages/2_Ordenes.py --sesiones 8
+
+Cada sesión es un AppTest que abre la página y cambia al azar los filtros de la barra lateral (años, procesos y
+familias) `--interacciones` veces. Las sesiones corren a la vez en hilos del mismo proceso, como en un servidor de
+Streamlit, y comparten sus cachés. Antes se abre una sesión que construye los datos (el arranque en frío).
+
+Por página y cantidad de sesiones se informan:
+- la latencia de las ejecuciones tras cambiar un filtro (p50, p95 y p99), y la p50 de la primera de cada sesión
+- el throughput: ejecuciones por segundo entre todas las sesiones
+- el RSS del proceso al empezar, su pico (VmHWM de Linux) y el RSS al terminar
+Con BUDGET_MONITOR_CACHE_MB=0 se mide sin la caché de resultados compartida.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.sesiones import PAGINAS, RAIZ, pico_mb, reiniciar_pico, rss_mb
+
+# Segundos máximos de una ejecución de página (la primera construye los datos)
+TIEMPO_MAXIMO = 900
+
+
+# Cambiar al azar los filtros de la barra lateral: uno o dos años, algunos procesos y una o ambas familias.
+# Los procesos se eligen entre `todos_procesos` (la selección por defecto), que conservan su tipo
+def _cambiar_filtros(sesion, azar, todos_procesos):
+    años, procesos, familias = sesion.sidebar.multiselect[:3]
+    opciones_años = [int(opcion) for opcion in años.options if opcion.isdigit()]
+    años.set_value(azar.sample(opciones_años, min(azar.choice([1, 1, 1, 2]), len(opciones_años))))
+    procesos.set_value(azar.sample(todos_procesos, azar.randint(1, len(todos_procesos))))
+    familias.set_value(azar.choice([['Materiales'], ['Servicios'], ['Materiales', 'Servicios']]))
+
+
+# AppTest instala un Runtime simulado al empezar cada ejecución y lo quita al terminar, pensando en una sola sesión:
+# con sesiones concurrentes, la primera que termina se lo quitaría a las que siguen corriendo. Durante la prueba se
+# sigue entregando el último Runtime instalado.
+def conservar_runtime():
+    from streamlit.runtime.runtime import Runtime
+
+    ultimo = []
+
+    def instancia(cls):
+        if cls._instance is not None:
+            ultimo[:] = [cls._instance]
+        if not ultimo:
+            raise RuntimeError("Runtime hasn't been created!")
+        return ultimo[0]
+
+    Runtime.instance = classmethod(instancia)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or bool(ultimo))
+
+
+def _sesion(pagina, interacciones, semilla):
+    from streamlit.testing.v1 import AppTest
+
+    azar = random.Random(semilla)
+    sesion = AppTest.from_file(str(RAIZ / pagina), default_timeout=TIEMPO_MAXIMO)
+    inicio = time.perf_counter()
+    sesion.run()
+    primera = time.perf_counter() - inicio
+    todos_procesos = list(sesion.sidebar.multiselect[1].value)
+
+    latencias, errores = [], len(sesion.exception)
+    for _ in range(interacciones):
+        _cambiar_filtros(sesion, azar, todos_procesos)
+        inicio = time.perf_counter()
+        sesion.run()
+        latencias.append(time.perf_counter() - inicio)
+        errores += len(sesion.exception)
+    return primera, latencias, errores
+
+
+def medir_carga(pagina, sesiones, interacciones=10, semilla=0):
+    """Latencias, throughput y memoria de `sesiones` sesiones concurrentes de `pagina` (con los datos ya construidos)."""
+    rss_inicial = rss_mb()
+    reiniciar_pico()
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sesiones) as pool:
+        resultados = list(pool.map(lambda numero: _sesion(pagina, interacciones, semilla + numero), range(sesiones)))
+    duracion = time.perf_counter() - inicio
+
+    latencias = np.array([latencia for _, sesion, _ in resultados for latencia in sesion]) * 1000
+    primeras = np.array([primera for primera, _, _ in resultados]) * 1000
+    p50, p95, p99 = np.percentile(latencias, [50, 95, 99]) if len(latencias) else (np.nan,) * 3
+    return {
+        'pagina': pagina,
+        'sesiones': sesiones,
+        'ejecuciones': len(latencias) + len(primeras),
+        'p50_ms': p50,
+        'p95_ms': p95,
+        'p99_ms': p99,
+        'max_ms': latencias.max() if len(latencias) else np.nan,
+        'primera_p50_ms': np.percentile(primeras, 50),
+        'ejecuciones_por_s': (len(latencias) + len(primeras)) / duracion,
+        'rss_inicial_mb': rss_inicial,
+        'pico_mb': pico_mb(),
+        'rss_mb': rss_mb(),
+        'errores': sum(errores for _, _, errores in resultados),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filas', type=int, default=100_000, help="filas de gasto sintético (si no se da --datos)")
+    parser.add_argument('--datos', help="directorio con los archivos de las fuentes (nombres de producción)")
+    parser.add_argument('--sesiones', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--interacciones', type=int, default=10)
+    parser.add_argument('--paginas', nargs='+', default=PAGINAS)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', default=f"benchmarks/resultados/carga_{datetime.now():%Y%m%d_%H%M%S}.json")
+    argumentos = parser.parse_args()
+
+    datos = argumentos.datos
+    if datos is None:
+        from benchmarks.sintetico import escribir
+
+        datos = tempfile.mkdtemp(prefix='budget_monitor_')
+        escribir(datos, argumentos.filas)
+    os.environ['BUDGET_MONITOR_DIR_DATOS'] = str(datos)
+
+    from benchmarks.etapas import entorno
+
+    conservar_runtime()
+    reporte = {'entorno': entorno(), 'datos': str(datos), 'arranque': {}, 'resultados': []}
+    for pagina in argumentos.paginas:
+        inicio = time.perf_counter()
+        _sesion(pagina, 0, argumentos.semilla)
+        reporte['arranque'][pagina] = time.perf_counter() - inicio
+        print(f"{pagina}: arranque en frío {reporte['arranque'][pagina]:.2f} s")
+        for sesiones in argumentos.sesiones:
+            reporte['resultados'].append(medir_carga(pagina, sesiones, argumentos.interacciones, argumentos.semilla))
+
+    tabla = pd.DataFrame(reporte['resultados'])
+    print(tabla.to_string(index=False, float_format='{:.1f}'.format))
+    salida = Path(argumentos.salida)
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    salida.write_text(json.dumps(reporte, indent=2, default=float))
+    print(f"Resultados en {salida}")
@@ -0,0 +1,220 @@
+"""Benchmark por etapa del pipeline sobre datos sintéticos.
+
+Uso:
+    python -m benchmarks.etapas --filas 10000 100000 1000000 --salida resultados.json
+    python -m benchmarks.etapas --comparar anterior.json actual.json
+
+El tiempo de cada etapa es el mínimo de `--repeticiones` pasadas sin trazado de memoria;
+el pico de memoria se mide en una pasada aparte con tracemalloc (asignaciones de Python y NumPy).
+Las columnas de texto respaldadas por Arrow no pasan por tracemalloc: para ellas se informa el
+cambio neto en el pool de memoria de Arrow.
+"""
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from benchmarks.sintetico import a_csv, generar
+from pipeline.cubo import construir_cubo, gasto_por_proceso, gasto_real_mensual, presupuesto_mensual, presupuesto_total
+from pipeline.enriquecimiento import eliminar_filas_grupo_ceco, preparar_gasto, verificar_columnas
+from pipeline.esquema import compactar_gasto, compactar_presupuesto
+from pipeline.fuentes import ESQUEMAS, parsear_fuente
+from pipeline.overhead import redistribuir_overhead
+from pipeline.pares import eliminar_pares_opuestos
+
+
+# Cada etapa recibe y modifica el contexto; devuelve el DataFrame principal para contar filas
+def _carga(ctx):
+    for nombre in ('data0', 'presupuesto', 'ordenes', 'utec', 'ceco'):
+        ctx[nombre] = parsear_fuente(ctx['csv'][nombre], ESQUEMAS[nombre])
+    return ctx['data0']
+
+
+def _dimensiones(ctx):
+    # Tipos, Orden -> Utec -> Proceso/Recinto y fallback Ceco se resuelven en una sola pasada
+    verificar_columnas(ctx['ordenes'], ctx['utec'], ctx['ceco'])
+    ctx['data0']['id'] = range(1, len(ctx['data0']) + 1)
+    ctx['data0'], ctx['reporte_dimensiones'] = preparar_gasto(ctx['data0'], ctx['ordenes'], ctx['utec'], ctx['ceco'])
+    return ctx['data0']
+
+
+def _pares(ctx):
+    ctx['data0'], ctx['removed_data'] = eliminar_pares_opuestos(ctx['data0'])
+    return ctx['data0']
+
+
+def _grupo_ceco(ctx):
+    ctx['data0'] = eliminar_filas_grupo_ceco(ctx['data0'])
+    return ctx['data0']
+
+
+def _normalizacion_ceco(ctx):
+    ctx['data0']['Centro de coste'] = ctx['data0']['Centro de coste'].str.strip().str.upper()
+    return ctx['data0']
+
+
+def _overhead(ctx):
+    ctx['data0'] = redistribuir_overhead(ctx['data0'])
+    return ctx['data0']
+
+
+def _esquema(ctx):
+    ctx['data0'] = compactar_gasto(ctx['data0'])
+    ctx['presupuesto'] = compactar_presupuesto(ctx['presupuesto'])
+    return ctx['data0']
+
+
+def _cubo(ctx):
+    ctx['cubo'] = construir_cubo(ctx['data0'], ctx['presupuesto'])
+    return ctx['cubo'].gasto
+
+
+# Consultas de la página de Gasto con los filtros por defecto
+def _agregaciones_gasto(ctx):
+    cubo = ctx['cubo']
+    años, procesos = [max(cubo.años)], cubo.procesos
+    familias = ['Materiales', 'Servicios']
+    gasto_real = gasto_real_mensual(cubo, años, procesos, familias)
+    presupuesto_mensual(cubo, años, procesos, familias)
+    presupuesto_total(cubo, años, procesos, familias)
+    for familia in familias:
+        gasto_por_proceso(cubo, años, procesos, familias, familia)
+    return gasto_real
+
+
+# Consultas de la página de Órdenes: filtro por fila, métricas por tipo (clase de orden resuelta al enriquecer) y top 5
+def _agregaciones_ordenes(ctx):
+    data0 = ctx['data0']
+    filtrado = data0[
+        data0['Ejercicio'].isin([data0['Ejercicio'].max()]) &
+        data0['Familia_Cuenta'].isin(['Materiales', 'Servicios'])
+    ]
+    filtrado.groupby('Clase de orden', observed=True).agg(
+        cantidad_ordenes=pd.NamedAgg(column='Orden partner', aggfunc='count'),
+        gasto=pd.NamedAgg(column='Valor/mon.inf.', aggfunc='sum'),
+    )
+    filtrado.groupby(['Período', 'Clase de orden'], observed=True)['Valor/mon.inf.'].sum()
+    filtrado.sort_values(by='Valor/mon.inf.', ascending=False).head(5)
+    return filtrado
+
+
+ETAPAS = [
+    ('carga', _carga),
+    ('dimensiones', _dimensiones),
+    ('pares', _pares),
+    ('grupo_ceco', _grupo_ceco),
+    ('normalizacion_ceco', _normalizacion_ceco),
+    ('overhead', _overhead),
+    ('esquema', _esquema),
+    ('cubo', _cubo),
+    ('agregaciones_gasto', _agregaciones_gasto),
+    ('agregaciones_ordenes', _agregaciones_ordenes),
+]
+
+
+def _pasada(csv, memoria=False):
+    ctx = {'csv': csv, 'data0': None}
+    resultados = []
+    for nombre, etapa in ETAPAS:
+        filas_entrada = 0 if ctx['data0'] is None else len(ctx['data0'])
+        if memoria:
+            tracemalloc.start()
+        arrow_inicial = pa.total_allocated_bytes()
+        inicio = time.perf_counter()
+        salida = etapa(ctx)
+        segundos = time.perf_counter() - inicio
+        pico = 0
+        if memoria:
+            pico = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        resultados.append({
+            'etapa': nombre,
+            'segundos': segundos,
+            'memoria_pico_mb': pico / 2**20,
+            'arrow_neto_mb': (pa.total_allocated_bytes() - arrow_inicial) / 2**20,
+            'filas_entrada': filas_entrada,
+            'filas_salida': len(salida),
+        })
+    return resultados
+
+
+def medir(filas, repeticiones=3, semilla=0):
+    """Mide tiempo y pico de memoria de cada etapa para `filas` filas de gasto sintético."""
+    csv = {nombre: a_csv(data) for nombre, data in generar(filas, semilla).items() if nombre != 'data0_ordenes'}
+    pasadas = [_pasada(csv) for _ in range(repeticiones)]
+    memoria = _pasada(csv, memoria=True)
+
+    etapas = []
+    for i, resultado in enumerate(memoria):
+        resultado['segundos'] = min(pasada[i]['segundos'] for pasada in pasadas)
+        etapas.append(resultado)
+    return {
+        'filas': filas,
+        'bytes_csv': len(csv['data0']),
+        'total_segundos': sum(etapa['segundos'] for etapa in etapas),
+        'etapas': etapas,
+    }
+
+
+def entorno():
+    return {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'maquina': platform.machine(),
+        'procesador': platform.processor(),
+    }
+
+
+def comparar(anterior, actual):
+    """Tabla con la razón actual/anterior del tiempo y la memoria por tamaño y etapa."""
+    filas = []
+    base = {(r['filas'], e['etapa']): e for r in anterior['resultados'] for e in r['etapas']}
+    for resultado in actual['resultados']:
+        for etapa in resultado['etapas']:
+            previa = base.get((resultado['filas'], etapa['etapa']))
+            if previa is None:
+                continue
+            filas.append({
+                'filas': resultado['filas'],
+                'etapa': etapa['etapa'],
+                'segundos_antes': previa['segundos'],
+                'segundos_ahora': etapa['segundos'],
+                'razon_tiempo': etapa['segundos'] / previa['segundos'] if previa['segundos'] else np.nan,
+                'razon_memoria': etapa['memoria_pico_mb'] / previa['memoria_pico_mb'] if previa['memoria_pico_mb'] else np.nan,
+            })
+    return pd.DataFrame(filas)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filas', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', default=f"benchmarks/resultados/etapas_{datetime.now():%Y%m%d_%H%M%S}.json")
+    parser.add_argument('--comparar', nargs=2, metavar=('ANTERIOR', 'ACTUAL'))
+    argumentos = parser.parse_args()
+
+    if argumentos.comparar:
+        anterior, actual = (json.loads(Path(ruta).read_text()) for ruta in argumentos.comparar)
+        print(comparar(anterior, actual).to_string(index=False, float_format='{:.3f}'.format))
+    else:
+        reporte = {'entorno': entorno(), 'resultados': []}
+        for filas in argumentos.filas:
+            resultado = medir(filas, argumentos.repeticiones, argumentos.semilla)
+            reporte['resultados'].append(resultado)
+            print(f"{filas:>10,} filas: {resultado['total_segundos']:.2f} s")
+            for etapa in resultado['etapas']:
+                print(f"    {etapa['etapa']:<22} {etapa['segundos']:8.3f} s {etapa['memoria_pico_mb']:9.1f} MB {etapa['arrow_neto_mb']:+9.1f} MB Arrow")
+        salida = Path(argumentos.salida)
+        salida.parent.mkdir(parents=True, exist_ok=True)
+        salida.write_text(json.dumps(reporte, indent=2))
+        print(f"Resultados en {salida}")
@@ -0,0 +1,100 @@
+"""Memoria por sesión de las páginas de Gasto y Órdenes sobre datos sintéticos.
+
+Uso:
+    python -m benchmarks.sesiones --filas 100000 --sesiones 10
+    python -m benchmarks.sesiones --datos datos_sinteticos/ --paginas pages/2_Ordenes.py
+
+Tras dos sesiones de calentamiento (que llenan las cachés del proceso), abre `--sesiones` sesiones con AppTest,
+una tras otra y sin cerrarlas. Cada sesión ejecuta la página y quita un proceso distinto. Se informa la mediana,
+por sesión, de la memoria que queda retenida (RSS después menos RSS antes) y del pico transitorio de sus
+ejecuciones sobre el RSS inicial, que es lo que suma cada sesión concurrente. El pico se mide con VmHWM de Linux;
+en otros sistemas solo se informa la memoria retenida.
+"""
+import argparse
+import gc
+import os
+import resource
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+RAIZ = Path(__file__).resolve().parent.parent
+PAGINAS = ['pages/1_Gasto.py', 'pages/2_Ordenes.py']
+
+
+# RSS actual del proceso en MB, tras liberar lo recolectable (en Linux desde /proc; si no, el máximo histórico)
+def rss_mb():
+    gc.collect()
+    try:
+        paginas = int(Path('/proc/self/statm').read_text().split()[1])
+        return paginas * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+
+
+# Reiniciar el pico de RSS (VmHWM); devuelve False si el sistema no lo permite
+def reiniciar_pico():
+    try:
+        Path('/proc/self/clear_refs').write_text('5')
+        return True
+    except OSError:
+        return False
+
+
+def pico_mb():
+    for linea in Path('/proc/self/status').read_text().splitlines():
+        if linea.startswith('VmHWM:'):
+            return int(linea.split()[1]) / 2**10
+    return np.nan
+
+
+# Cada sesión quita un proceso distinto, para que no reutilice los resultados cacheados de otra
+def _ejecutar_sesion(pagina, numero):
+    from streamlit.testing.v1 import AppTest
+
+    sesion = AppTest.from_file(str(RAIZ / pagina), default_timeout=900)
+    sesion.run()
+    procesos = sesion.sidebar.multiselect[1]
+    procesos.unselect(procesos.value[numero % len(procesos.value)]).run()
+    return sesion
+
+
+def medir_sesiones(pagina, sesiones=10):
+    """Memoria retenida y pico transitorio (MB) de cada sesión de `pagina`, con las cachés ya calientes."""
+    # Dos sesiones de calentamiento: la primera construye los datos, la segunda deja atrás sus temporales
+    abiertas = [_ejecutar_sesion(pagina, 0), _ejecutar_sesion(pagina, 0)]
+    resultados = []
+    for numero in range(1, sesiones + 1):
+        antes = rss_mb()
+        con_pico = reiniciar_pico()
+        abiertas.append(_ejecutar_sesion(pagina, numero))
+        resultados.append({
+            'retenido_mb': rss_mb() - antes,
+            'pico_mb': pico_mb() - antes if con_pico else np.nan,
+        })
+    return resultados
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filas', type=int, default=100_000, help="filas de gasto sintético (si no se da --datos)")
+    parser.add_argument('--datos', help="directorio con los archivos de las fuentes (nombres de producción)")
+    parser.add_argument('--sesiones', type=int, default=10)
+    parser.add_argument('--paginas', nargs='+', default=PAGINAS)
+    argumentos = parser.parse_args()
+
+    datos = argumentos.datos
+    if datos is None:
+        from benchmarks.sintetico import escribir
+
+        datos = tempfile.mkdtemp(prefix='budget_monitor_')
+        escribir(datos, argumentos.filas)
+    os.environ['BUDGET_MONITOR_DIR_DATOS'] = str(datos)
+
+    for pagina in argumentos.paginas:
+        inicio = rss_mb()
+        resultados = medir_sesiones(pagina, argumentos.sesiones)
+        retenido = np.median([r['retenido_mb'] for r in resultados])
+        pico = np.median([r['pico_mb'] for r in resultados])
+        print(f"{pagina}: RSS {inicio:.0f} -> {rss_mb():.0f} MB; por sesión {retenido:.1f} MB retenidos, pico {pico:.1f} MB")
@@ -0,0 +1,116 @@
+"""Generador de datos sintéticos con los mismos esquemas que los archivos de S3.
+
+Uso: python -m benchmarks.sintetico FILAS DIRECTORIO
+Escribe las seis fuentes con sus nombres de producción, de modo que la app se puede
+levantar sin S3 con BUDGET_MONITOR_DIR_DATOS=DIRECTORIO.
+"""
+import argparse
+import io
+from pathlib import Path
+from urllib.parse import urlparse
+
+import numpy as np
+import pandas as pd
+
+from pipeline.fuentes import FUENTES
+
+PROCESOS = ['Producción', 'Distribución', 'Recolección', 'Depuración', 'Overhead']
+FAMILIAS = ['Materiales', 'Servicios']
+GRUPOS_CECO = ['Mantención', 'Operación', 'Abastecimiento y contratos', 'Finanzas', 'Servicios generales']
+CLASES_ORDEN = ['PM01', 'PM02', 'PM03', 'PM04', 'PM05']
+
+
+def generar(filas, semilla=0, años=(2023, 2024)):
+    """Devuelve un diccionario nombre -> DataFrame con las fuentes crudas (como las entrega el CSV)."""
+    rng = np.random.default_rng(semilla)
+
+    # Las tablas de referencia crecen con el volumen, como en producción
+    n_ordenes = max(1_000, filas // 20)
+    n_utec = max(100, filas // 2_000)
+    n_ceco = max(200, filas // 1_000)
+    utecs = np.array([f'U{i:05d}' for i in range(n_utec)])
+    cecos = np.array([f'C{i:06d}' for i in range(n_ceco)])
+    ordenes = np.arange(4_000_000, 4_000_000 + n_ordenes)
+
+    utec = pd.DataFrame({
+        'Utec': utecs,
+        'Proceso': rng.choice(PROCESOS, n_utec, p=[.3, .3, .15, .15, .1]),
+        'Recinto': rng.choice([f'R{i:02d}' for i in range(40)], n_utec),
+    })
+    ceco = pd.DataFrame({
+        'Ceco': cecos,
+        'Proceso': rng.choice(PROCESOS, n_ceco),
+        'Recinto': rng.choice([f'R{i:02d}' for i in range(40)], n_ceco),
+    })
+    # Algunas órdenes apuntan a Utec inexistentes para ejercitar el fallback por Ceco
+    ordenes_df = pd.DataFrame({
+        'Orden': ordenes,
+        'Utec': np.where(rng.random(n_ordenes) < 0.05, 'SIN_UTEC', rng.choice(utecs, n_ordenes)),
+        'Clase de orden': rng.choice(CLASES_ORDEN, n_ordenes, p=[.4, .25, .15, .1, .1]),
+        'Texto breve': 'Mantenimiento',
+    })
+
+    # Gasto: 85% de filas base y 15% de reversas (copias negadas en el mismo período o hasta dos después)
+    base = filas - filas * 15 // 100
+    valores = rng.choice([1_000, 2_500, 10_000, 12_345, 50_000, 99_999], base) * rng.integers(1, 30, base)
+    valores = np.where(rng.random(base) < 0.1, -valores, valores)
+    con_orden = rng.random(base) < 0.7
+    data0 = pd.DataFrame({
+        'Ejercicio': rng.choice(años, base),
+        'Período': rng.integers(1, 13, base),
+        'Clase de coste': rng.choice([f'6100{i:04d}' for i in range(40)], base),
+        # Variantes con espacios y minúsculas, como llegan desde SAP
+        'Centro de coste': np.where(rng.random(base) < 0.01, ' c000001 ', rng.choice(cecos, base)),
+        'Orden partner': np.where(con_orden, rng.choice(ordenes, base).astype('float64'), np.nan),
+        'Grupo_Ceco': rng.choice(GRUPOS_CECO, base, p=[.5, .35, .05, .05, .05]),
+        'Familia_Cuenta': rng.choice(FAMILIAS, base),
+        'Denominación del objeto': 'Objeto',
+        'Fe.contabilización': '01.01.2024',
+        'Valor/mon.inf.': valores,
+    })
+    reversas = data0.sample(n=filas - base, random_state=semilla)
+    reversas = reversas.assign(
+        **{'Valor/mon.inf.': -reversas['Valor/mon.inf.'],
+           'Período': np.minimum(reversas['Período'] + rng.integers(0, 3, len(reversas)), 12)},
+    )
+    data0 = pd.concat([data0, reversas]).sample(frac=1, random_state=semilla + 1).reset_index(drop=True)
+    # Montos con separador de miles, como en el CSV de producción
+    data0['Valor/mon.inf.'] = [f'{valor:,}' for valor in data0['Valor/mon.inf.']]
+
+    presupuesto = pd.MultiIndex.from_product(
+        [años, range(1, 13), PROCESOS, FAMILIAS], names=['Año', 'Mes', 'Proceso', 'Familia_Cuenta'],
+    ).to_frame(index=False)
+    presupuesto['Presupuesto'] = rng.uniform(10, 100, len(presupuesto)).round(2)
+
+    return {
+        'data0': data0,
+        'data0_ordenes': data0,
+        'presupuesto': presupuesto,
+        'ordenes': ordenes_df,
+        'utec': utec,
+        'ceco': ceco,
+    }
+
+
+def a_csv(data) -> bytes:
+    """Serializa como los archivos de producción (ISO-8859-1, separado por ';')."""
+    buffer = io.StringIO()
+    data.to_csv(buffer, sep=';', index=False)
+    return buffer.getvalue().encode('ISO-8859-1')
+
+
+def escribir(directorio, filas, semilla=0):
+    """Escribe las fuentes sintéticas en `directorio` con los nombres de archivo de S3."""
+    directorio = Path(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    for nombre, data in generar(filas, semilla).items():
+        (directorio / Path(urlparse(FUENTES[nombre]).path).name).write_bytes(a_csv(data))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('filas', type=int)
+    parser.add_argument('directorio')
+    parser.add_argument('--semilla', type=int, default=0)
+    argumentos = parser.parse_args()
+    escribir(argumentos.directorio, argumentos.filas, argumentos.semilla)
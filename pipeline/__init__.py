@@ -0,0 +1,142 @@
+from pipeline.actualizacion import INTERVALO_ACTUALIZACION, Actualizador, VersionDatos, describir_version
+from pipeline.compartido import (
+    DIRECTORIO_COMPARTIDO,
+    VERSION_COMPARTIDO,
+    directorio_compartido,
+    escribir_compartido,
+    leer_compartido,
+    limpiar_versiones,
+    modo_compartido,
+    publicar,
+)
+from pipeline.cubo import (
+    ConsultasCubo,
+    CuboGasto,
+    actualizar_celdas,
+    agregar_gasto,
+    construir_cubo,
+    filtrar_gasto,
+    filtrar_presupuesto,
+    formatear_gasto_real,
+    gasto_por_proceso,
+    gasto_real_mensual,
+    presupuesto_mensual,
+    presupuesto_total,
+    resumir_presupuesto,
+    todos_los_procesos,
+)
+from pipeline.datos import (
+    FUENTES_PAGINAS,
+    DatosMonitor,
+    actualizador,
+    consultas_gasto,
+    consultas_ordenes,
+    construir_datos,
+    crear_consultas,
+    modo_almacenamiento,
+    precalentar,
+    preparar_almacen,
+    preparar_compartido,
+    version_datos,
+)
+from pipeline.descargas import DIRECTORIO_DESCARGAS, descargar, validadores
+from pipeline.diagnostico import (
+    REGISTROS,
+    cerrar_seccion,
+    contexto,
+    diagnostico_activo,
+    en_contexto,
+    etapa,
+    iniciar_pagina,
+    mostrar_diagnostico,
+    registros,
+    seccion,
+)
+from pipeline.dimensiones import ATRIBUTOS_ORDEN, dimension_ordenes, resolver_dimensiones
+from pipeline.enriquecimiento import completar_gasto, eliminar_filas_grupo_ceco, enriquecer, preparar_gasto
+from pipeline.esquema import compactar_gasto, concatenar_gasto, compactar_presupuesto, reporte_memoria
+from pipeline.fuentes import (
+    BASE_CECO_URL,
+    BASE_UTEC_URL,
+    BUDGET_URL,
+    DATA0_ORDENES_URL,
+    DATA0_URL,
+    ESQUEMAS,
+    FUENTES,
+    MAX_HILOS_CARGA,
+    ORDERS_URL,
+    ErrorCarga,
+    cargar_fuentes,
+    leer_bytes,
+    load_data,
+    parsear_con_esquema,
+    parsear_csv,
+    parsear_fuente,
+    ubicacion,
+    ubicaciones,
+)
+from pipeline.incremental import DIRECTORIO_INCREMENTAL, directorio_estado, ingerir, modo_incremental, verificar
+from pipeline.mayores import (
+    AGRUPACIONES,
+    CLAVES_MAYORES,
+    MAX_MAYORES,
+    IndiceMayores,
+    construir_mayores,
+    mayores_gastos,
+)
+from pipeline.ordenes import (
+    COLUMNAS_TOP_GASTOS,
+    ConsultasOrdenes,
+    filtrar_gasto_ordenes,
+    gasto_con_ot,
+    gasto_mensual_tipo_orden,
+    metricas_tipo_orden,
+    top_gastos,
+)
+from pipeline.overhead import REPARTO_OVERHEAD, redistribuir_overhead
+from pipeline.pares import eliminar_pares_opuestos, emparejar_opuestos, eliminar_pares_opuestos_iterativo
+from pipeline.particiones import (
+    DIRECTORIO_PARTICIONES,
+    MAX_MB_PARTICIONES,
+    AlmacenParticiones,
+    ConsultasParticionadas,
+    directorio_particiones,
+    escribir_particiones,
+    modo_particionado,
+)
+from pipeline.resultados import MAX_MB_RESULTADOS, RESULTADOS, CacheResultados, normalizar_filtros, resultado_pagina
+from pipeline.snapshots import (
+    DIRECTORIO_SNAPSHOTS,
+    SNAPSHOTS_CONSERVADOS,
+    cargar_con_snapshot,
+    huella,
+    leer_snapshot,
+    limpiar_snapshots,
+    nombre_fuente,
+)
+from pipeline.sql import MOTORES, ConsultasSQL, motor_consultas
+from pipeline.vistas import (
+    COLORES_OT,
+    PRESUPUESTO_MEDIO_MENSUAL,
+    REPORTES,
+    SECCIONES,
+    figura_diferencial,
+    figura_gauge,
+    figura_tipo_orden,
+    figura_torta,
+    gasto_acumulado,
+    porcentaje_gasto_con_ot,
+    porcentaje_presupuesto_gastado,
+    proyeccion_anual,
+    reporte_gasto,
+    reporte_ordenes,
+    seccion_detalle,
+    seccion_indicadores,
+    seccion_porcentaje_ot,
+    seccion_tipo_orden,
+    seccion_top_gastos,
+    seccion_tortas,
+    tabla_metricas_tipo_orden,
+    tabla_real_vs_presupuesto,
+    tabla_top_gastos,
+)
@@ -0,0 +1,94 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, NamedTuple
+
+from pipeline.diagnostico import etapa
+
+# Minutos entre revisiones de las fuentes (BUDGET_MONITOR_ACTUALIZACION_MIN, 15 por defecto; 0 desactiva el hilo)
+INTERVALO_ACTUALIZACION = float(os.environ.get('BUDGET_MONITOR_ACTUALIZACION_MIN', 15))
+
+logger = logging.getLogger('budget_monitor.actualizacion')
+
+
+class VersionDatos(NamedTuple):
+    """Una versión construida de los datos: la firma de sus fuentes, sus consultas y cuándo y en cuánto se construyó."""
+    firma: str
+    consultas: Any
+    construida: datetime
+    segundos: float
+
+
+# Texto de una versión para la barra lateral: firma corta, fecha y duración de la construcción
+def describir_version(version):
+    return f"Datos versión {version.firma[:8]}, construida el {version.construida:%d-%m-%Y %H:%M} en {version.segundos:.1f} s"
+
+
+class Actualizador:
+    """Versión vigente de unos datos, reconstruida en segundo plano cuando cambian sus fuentes.
+
+    `firmar()` identifica el contenido de las fuentes sin leerlo y `construir()` ejecuta el pipeline. Solo la
+    primera versión se construye al pedirla; después un hilo revisa la firma cada `intervalo` minutos y, si cambió,
+    construye la versión nueva fuera de las sesiones y la publica reemplazando la referencia. Hasta entonces las
+    sesiones siguen con la anterior; si la reconstrucción falla, se conserva la vigente y el error queda en `error`.
+    """
+
+    def __init__(self, firmar, construir, intervalo=None):
+        self.firmar = firmar
+        self.construir = construir
+        self.intervalo = INTERVALO_ACTUALIZACION if intervalo is None else intervalo
+        self.error = None
+        self._vigente = None
+        self._candado = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    @property
+    def listo(self):
+        return self._vigente is not None
+
+    def vigente(self) -> VersionDatos:
+        """Versión publicada; la primera vez la construye (las sesiones que llegan mientras tanto la esperan)."""
+        version = self._vigente
+        if version is None:
+            with self._candado:
+                if self._vigente is None:
+                    self._vigente = self._construir(self.firmar())
+                    self._iniciar()
+                version = self._vigente
+        return version
+
+    def _construir(self, firma):
+        inicio = time.perf_counter()
+        with etapa(f'version {firma[:8]}'):
+            consultas = self.construir()
+        return VersionDatos(firma, consultas, datetime.now(), time.perf_counter() - inicio)
+
+    def revisar(self):
+        """Construye y publica una versión nueva si cambiaron las fuentes; devuelve si la hubo."""
+        with self._candado:
+            firma = self.firmar()
+            if self._vigente is not None and self._vigente.firma == firma:
+                return False
+            # Una sola asignación: cada sesión ve la versión anterior o la nueva completa, nunca una mezcla
+            self._vigente = self._construir(firma)
+            return True
+
+    def _iniciar(self):
+        if self.intervalo > 0 and self._hilo is None:
+            self._hilo = threading.Thread(target=self._ciclo, name='actualizacion-datos', daemon=True)
+            self._hilo.start()
+
+    def _ciclo(self):
+        while not self._detener.wait(self.intervalo * 60):
+            try:
+                self.revisar()
+                self.error = None
+            except Exception as error:
+                logger.exception("No se pudo actualizar los datos; se mantiene la versión %s", self._vigente.firma[:8])
+                self.error = error
+
+    def detener(self):
+        self._detener.set()
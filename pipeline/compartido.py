@@ -0,0 +1,175 @@
+"""Datos enriquecidos publicados una vez por versión en archivos Arrow que todos los procesos mapean en memoria.
+
+Con BUDGET_MONITOR_COMPARTIDO=1 el pipeline completo corre una sola vez por versión de los datos, aunque haya varios
+procesos de Streamlit. El primero que llega lo ejecuta (los demás esperan su candado) y publica en
+`.compartido/<fuentes>/<versión>/` (o en BUDGET_MONITOR_DIR_COMPARTIDO):
+- gasto, presupuesto y ordenes: las tablas del pipeline
+- celdas y presupuesto_cubo: las tablas del cubo de la página de Gasto
+- mayores*: las particiones del índice de mayores gastos de la página de Órdenes
+- manifiesto.json: los años y procesos del cubo y las particiones del índice
+Cada tabla se guarda sin compresión, en un solo bloque y con NaN en vez de nulos en las columnas decimales. Así, al
+mapear el archivo, las columnas numéricas y de texto son vistas de sus páginas, que el sistema operativo comparte
+entre procesos; solo los códigos de las columnas categóricas se copian. De cada fuente se conservan las dos
+últimas versiones.
+"""
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from pipeline.cubo import CuboGasto
+from pipeline.diagnostico import etapa
+from pipeline.mayores import IndiceMayores, construir_mayores
+from pipeline.particiones import a_json, desde_json, version_fuentes
+from pipeline.snapshots import huella
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin candado entre procesos, cada uno puede construir la versión
+    fcntl = None
+
+# Directorio de las versiones publicadas
+DIRECTORIO_COMPARTIDO = Path(os.environ.get('BUDGET_MONITOR_DIR_COMPARTIDO', Path(__file__).resolve().parent.parent / '.compartido'))
+
+# Versiones publicadas que se conservan en disco (la vigente y la anterior, que otro proceso puede seguir usando)
+VERSIONES_CONSERVADAS = 2
+
+# Cambia si cambia el formato de los archivos o el pipeline que los produce
+VERSION_COMPARTIDO = 1
+
+TABLAS_COMPARTIDAS = ['gasto', 'presupuesto', 'ordenes', 'celdas', 'presupuesto_cubo']
+
+
+# Activar los datos compartidos desde el entorno (BUDGET_MONITOR_COMPARTIDO=1)
+def modo_compartido():
+    return os.environ.get('BUDGET_MONITOR_COMPARTIDO', '').lower() in ('1', 'true', 'si', 'sí')
+
+
+# Directorio de una versión: agrupado por fuentes (cada página tiene las suyas), para limpiar solo sus versiones
+def directorio_compartido(urls, reparto_overhead=None, directorio=None):
+    fuentes = huella(repr((tuple(str(url) for url in urls), reparto_overhead)).encode())
+    return Path(directorio or DIRECTORIO_COMPARTIDO) / fuentes / f'v{VERSION_COMPARTIDO}-{version_fuentes(urls, reparto_overhead)}'
+
+
+# Tabla Arrow de un DataFrame lista para mapear: NaN en vez de nulos en las columnas decimales y un solo bloque
+def _tabla_mapeable(data):
+    tabla = pa.Table.from_pandas(data.reset_index(drop=True), preserve_index=False)
+    for i, columna in enumerate(tabla.columns):
+        if pa.types.is_floating(columna.type) and columna.null_count:
+            tabla = tabla.set_column(i, tabla.field(i), pc.fill_null(columna, np.nan))
+    return tabla.combine_chunks()
+
+
+def _escribir_tabla(data, ruta):
+    tabla = _tabla_mapeable(data)
+    with pa.OSFile(str(ruta), 'wb') as destino, pa.ipc.new_file(destino, tabla.schema) as escritor:
+        escritor.write_table(tabla, max_chunksize=max(tabla.num_rows, 1))
+
+
+# Candado de archivo entre procesos para construir una versión una sola vez
+@contextmanager
+def _candado(directorio):
+    if fcntl is None:
+        yield
+        return
+    directorio.parent.mkdir(parents=True, exist_ok=True)
+    with open(directorio.with_name(f'{directorio.name}.lock'), 'w') as archivo:
+        fcntl.flock(archivo, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(archivo, fcntl.LOCK_UN)
+
+
+def escribir_compartido(datos, directorio):
+    """Publica las tablas de `datos` (un DatosMonitor) en `directorio`.
+
+    Se escribe en un directorio temporal que se renombra al final, así que nunca se mapea una versión a medias.
+    """
+    directorio = Path(directorio)
+    temporal = directorio.with_name(f'{directorio.name}.{os.getpid()}.tmp')
+    shutil.rmtree(temporal, ignore_errors=True)
+    temporal.mkdir(parents=True)
+
+    tablas = {
+        'gasto': datos.data0,
+        'presupuesto': datos.budget_data,
+        'ordenes': datos.orders_data,
+        'celdas': datos.cubo.gasto,
+        'presupuesto_cubo': datos.cubo.presupuesto,
+    }
+    mayores = construir_mayores(datos.data0)
+    particiones_mayores = {'_'.join(('mayores',) + extra): extra for extra in mayores.particiones}
+    for nombre, extra in particiones_mayores.items():
+        tablas[nombre] = mayores.particiones[extra]
+    for nombre, data in tablas.items():
+        _escribir_tabla(data, temporal / f'{nombre}.arrow')
+    manifiesto = {
+        'años': a_json(datos.cubo.años),
+        'procesos': a_json(datos.cubo.procesos),
+        'mayores': {'k': mayores.k, 'particiones': {nombre: list(extra) for nombre, extra in particiones_mayores.items()}},
+        'filas': len(datos.data0),
+    }
+    (temporal / 'manifiesto.json').write_text(json.dumps(manifiesto, indent=2, ensure_ascii=False), encoding='utf-8')
+
+    try:
+        os.replace(temporal, directorio)
+    except OSError:
+        shutil.rmtree(temporal, ignore_errors=True)
+
+
+def leer_compartido(directorio):
+    """Tablas publicadas en `directorio`, mapeadas en memoria: {'gasto', 'presupuesto', 'ordenes', 'cubo', 'mayores'}.
+
+    Los DataFrames comparten la memoria del archivo y son de solo lectura.
+    """
+    directorio = Path(directorio)
+    manifiesto = json.loads((directorio / 'manifiesto.json').read_text(encoding='utf-8'))
+    particiones_mayores = manifiesto['mayores']['particiones']
+    tablas = {}
+    for nombre in TABLAS_COMPARTIDAS + list(particiones_mayores):
+        with etapa(f'mapear {nombre}') as registro:
+            tabla = pa.ipc.open_file(pa.memory_map(str(directorio / f'{nombre}.arrow'))).read_all()
+            # Por columna (sin consolidar bloques), para que cada una siga siendo una vista del archivo
+            tablas[nombre] = tabla.to_pandas(split_blocks=True)
+            registro['filas_salida'] = len(tablas[nombre])
+    cubo = CuboGasto(
+        tablas.pop('celdas'), tablas.pop('presupuesto_cubo'),
+        desde_json(manifiesto['años']), desde_json(manifiesto['procesos']),
+    )
+    mayores = IndiceMayores(
+        manifiesto['mayores']['k'],
+        {tuple(extra): tablas.pop(nombre) for nombre, extra in particiones_mayores.items()},
+    )
+    return {**tablas, 'cubo': cubo, 'mayores': mayores}
+
+
+# Borrar las versiones más antiguas de unas fuentes (el directorio que agrupa sus versiones); los procesos que aún
+# las mapean conservan sus páginas
+def limpiar_versiones(directorio, conservar=VERSIONES_CONSERVADAS):
+    versiones = sorted(
+        (ruta for ruta in Path(directorio).glob(f'v{VERSION_COMPARTIDO}-*') if ruta.is_dir() and (ruta / 'manifiesto.json').exists()),
+        key=lambda ruta: ruta.stat().st_mtime_ns, reverse=True,
+    )
+    for ruta in versiones[conservar:]:
+        shutil.rmtree(ruta, ignore_errors=True)
+        ruta.with_name(f'{ruta.name}.lock').unlink(missing_ok=True)
+
+
+def publicar(urls, construir, reparto_overhead=None, directorio=None):
+    """Directorio de la versión actual de `urls`, publicándola con `construir()` (un DatosMonitor) si no existe.
+
+    Solo un proceso a la vez construye; los que esperaban encuentran la versión ya publicada.
+    """
+    destino = directorio_compartido(urls, reparto_overhead, directorio)
+    if not (destino / 'manifiesto.json').exists():
+        with _candado(destino):
+            if not (destino / 'manifiesto.json').exists():
+                escribir_compartido(construir(), destino)
+                limpiar_versiones(destino.parent)
+    return destino
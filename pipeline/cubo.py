@@ -0,0 +1,128 @@
+from typing import NamedTuple
+
+import pandas as pd
+
+# Dimensiones del cubo de gasto y de presupuesto
+DIMENSIONES_CUBO_GASTO = ['Ejercicio', 'Período', 'Proceso', 'Familia_Cuenta', 'Recinto']
+DIMENSIONES_CUBO_PRESUPUESTO = ['Año', 'Mes', 'Proceso', 'Familia_Cuenta']
+
+
+class CuboGasto(NamedTuple):
+    """Sumas de gasto y presupuesto precalculadas por año, mes, proceso y familia de cuenta."""
+    gasto: pd.DataFrame
+    presupuesto: pd.DataFrame
+    años: list
+    procesos: list
+
+
+# Celdas de gasto del cubo
+def agregar_gasto(data0):
+    return data0.groupby(DIMENSIONES_CUBO_GASTO, observed=True, dropna=False)['Valor/mon.inf.'].sum().reset_index()
+
+
+# Reemplazar las celdas de los meses (Ejercicio, Período) recalculados, sin reagregar el resto
+def actualizar_celdas(gasto, data0_meses, meses):
+    mes = pd.MultiIndex.from_arrays([gasto['Ejercicio'], gasto['Período']])
+    conservadas = gasto[~mes.isin(meses)]
+    gasto = pd.concat([conservadas, agregar_gasto(data0_meses)], ignore_index=True)
+    return gasto.sort_values(['Ejercicio', 'Período'], kind='stable', ignore_index=True)
+
+
+# Construir el cubo una vez por versión de los datos (o a partir de celdas de gasto ya agregadas)
+def construir_cubo(data0, budget_data, gasto=None) -> CuboGasto:
+    gasto = agregar_gasto(data0) if gasto is None else gasto
+    presupuesto = budget_data.groupby(DIMENSIONES_CUBO_PRESUPUESTO, observed=True, dropna=False)['Presupuesto'].sum().reset_index()
+    return CuboGasto(gasto, presupuesto, data0['Ejercicio'].unique().tolist(), data0['Proceso'].unique().tolist())
+
+
+# Celdas de gasto que cumplen los filtros de la barra lateral (sin filas con NaN en 'Familia_Cuenta')
+def filtrar_gasto(cubo, years, procesos, familias):
+    gasto = cubo.gasto
+    return gasto[
+        gasto['Ejercicio'].isin(years) &
+        gasto['Proceso'].isin(procesos) &
+        gasto['Familia_Cuenta'].isin(familias) &
+        gasto['Familia_Cuenta'].notna()
+    ]
+
+
+# Si la selección tiene todos los procesos; los NaN cuentan como un solo valor (el de la barra lateral puede ser
+# otro objeto NaN que el de las opciones, p. ej. tras deserializar el cubo en cada rerun)
+def todos_los_procesos(procesos, opciones):
+    return {None if pd.isna(proceso) else proceso for proceso in procesos} == {None if pd.isna(proceso) else proceso for proceso in opciones}
+
+
+# Celdas de presupuesto que cumplen los filtros; si todos los procesos están seleccionados se incluye el Overhead
+def filtrar_presupuesto(cubo, years, procesos, familias):
+    presupuesto = cubo.presupuesto
+    filtrado = presupuesto[
+        presupuesto['Año'].isin(years) &
+        presupuesto['Proceso'].isin(procesos) &
+        presupuesto['Familia_Cuenta'].isin(familias)
+    ]
+    if todos_los_procesos(procesos, cubo.procesos):
+        filtrado = pd.concat([filtrado, presupuesto[presupuesto['Proceso'] == 'Overhead']], ignore_index=True)
+    return filtrado
+
+
+# Gasto por proceso de una familia de cuenta (gráficos de torta)
+def gasto_por_proceso(cubo, years, procesos, familias, familia):
+    gasto = filtrar_gasto(cubo, years, procesos, familias)
+    gasto = gasto[gasto['Familia_Cuenta'] == familia]
+    return gasto.groupby('Proceso', observed=True)['Valor/mon.inf.'].sum().reset_index()
+
+
+# Gasto real mensual en millones con un decimal, con 'Año' como texto y 'Mes' entero
+def gasto_real_mensual(cubo, years, procesos, familias):
+    gasto = filtrar_gasto(cubo, years, procesos, familias)
+    return formatear_gasto_real(gasto.groupby(['Ejercicio', 'Período'])['Valor/mon.inf.'].sum().reset_index())
+
+
+# Formato común (pandas y SQL) del gasto real mensual ya sumado por 'Ejercicio' y 'Período'
+def formatear_gasto_real(gasto_real):
+    gasto_real['Valor/mon.inf.'] = (gasto_real['Valor/mon.inf.'] / 1000000).round(1)
+    gasto_real = gasto_real.rename(columns={'Ejercicio': 'Año', 'Período': 'Mes'})
+    gasto_real['Año'] = gasto_real['Año'].astype(str)
+    gasto_real['Mes'] = gasto_real['Mes'].astype(int)
+    return gasto_real
+
+
+# Presupuesto mensual con un decimal, con 'Año' como texto y 'Mes' entero
+def presupuesto_mensual(cubo, years, procesos, familias):
+    return resumir_presupuesto(filtrar_presupuesto(cubo, years, procesos, familias))
+
+
+# Suma por 'Año' y 'Mes' de las celdas de presupuesto filtradas, común a pandas y SQL
+# (los montos con centavos caen a menudo justo en el límite del redondeo, así que se suman siempre igual)
+def resumir_presupuesto(presupuesto):
+    gasto_presupuestado = presupuesto.groupby(['Año', 'Mes'])['Presupuesto'].sum().reset_index()
+    gasto_presupuestado['Presupuesto'] = gasto_presupuestado['Presupuesto'].round(1)
+    gasto_presupuestado['Año'] = gasto_presupuestado['Año'].astype(str)
+    gasto_presupuestado['Mes'] = gasto_presupuestado['Mes'].astype(int)
+    return gasto_presupuestado
+
+
+# Presupuesto total del período filtrado
+def presupuesto_total(cubo, years, procesos, familias):
+    return filtrar_presupuesto(cubo, years, procesos, familias)['Presupuesto'].sum()
+
+
+class ConsultasCubo:
+    """Consultas de la página de Gasto sobre el cubo en pandas (misma interfaz que ConsultasSQL)."""
+
+    def __init__(self, cubo):
+        self.cubo = cubo
+        self.años = cubo.años
+        self.procesos = cubo.procesos
+
+    def gasto_por_proceso(self, years, procesos, familias, familia):
+        return gasto_por_proceso(self.cubo, years, procesos, familias, familia)
+
+    def gasto_real_mensual(self, years, procesos, familias):
+        return gasto_real_mensual(self.cubo, years, procesos, familias)
+
+    def presupuesto_mensual(self, years, procesos, familias):
+        return presupuesto_mensual(self.cubo, years, procesos, familias)
+
+    def presupuesto_total(self, years, procesos, familias):
+        return presupuesto_total(self.cubo, years, procesos, familias)
@@ -0,0 +1,179 @@
+import logging
+from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import urlparse
+
+import pandas as pd
+import streamlit as st
+
+from pipeline.actualizacion import Actualizador, VersionDatos
+from pipeline.compartido import leer_compartido, modo_compartido, publicar
+from pipeline.cubo import ConsultasCubo, CuboGasto, construir_cubo
+from pipeline.diagnostico import etapa
+from pipeline.enriquecimiento import enriquecer
+from pipeline.esquema import compactar_presupuesto
+from pipeline.fuentes import cargar_fuentes, ubicaciones
+from pipeline.incremental import directorio_estado, ingerir, modo_incremental
+from pipeline.mayores import IndiceMayores
+from pipeline.ordenes import ConsultasOrdenes
+from pipeline.particiones import (
+    AlmacenParticiones,
+    ConsultasParticionadas,
+    directorio_particiones,
+    escribir_particiones,
+    modo_particionado,
+    version_fuentes,
+)
+from pipeline.sql import ConsultasSQL, motor_consultas
+
+# Fuente del gasto de cada página (las otras cuatro son comunes)
+FUENTES_PAGINAS = {'gasto': 'data0', 'ordenes': 'data0_ordenes'}
+
+logger = logging.getLogger('budget_monitor.precalentar')
+
+
+class DatosMonitor(NamedTuple):
+    """Resultado del pipeline: gasto enriquecido y tablas de referencia (y el índice de mayores gastos, si ya viene calculado)."""
+    data0: pd.DataFrame
+    removed_data: pd.DataFrame
+    budget_data: pd.DataFrame
+    orders_data: pd.DataFrame
+    reporte_dimensiones: dict = {}
+    cubo: CuboGasto = None
+    tiempos_carga: dict = {}
+    mayores: IndiceMayores = None
+
+
+def construir_datos(data0_url, budget_url, orders_url, base_utec_url, base_ceco_url, reparto_overhead=None, incremental=None) -> DatosMonitor:
+    """Carga las cinco fuentes y ejecuta el pipeline de enriquecimiento.
+
+    Con `incremental` (por defecto BUDGET_MONITOR_INCREMENTAL) solo se procesan los meses nuevos del gasto.
+    """
+    with etapa(f"construir_datos {Path(urlparse(str(data0_url)).path).name}") as registro:
+        # Las cinco fuentes se descargan y parsean en paralelo
+        with etapa('carga'):
+            fuentes, tiempos_carga = cargar_fuentes({
+                'data0': data0_url,
+                'presupuesto': budget_url,
+                'ordenes': orders_url,
+                'utec': base_utec_url,
+                'ceco': base_ceco_url,
+            })
+        data0, budget_data, orders_data = fuentes['data0'], fuentes['presupuesto'], fuentes['ordenes']
+        base_utec_data, base_ceco_data = fuentes['utec'], fuentes['ceco']
+        registro['filas_entrada'] = len(data0)
+
+        if incremental is None:
+            incremental = modo_incremental()
+
+        celdas_gasto = None
+        if incremental:
+            data0, removed_data, reporte_dimensiones, celdas_gasto = ingerir(
+                data0, orders_data, base_utec_data, base_ceco_data, reparto_overhead, directorio_estado(data0_url),
+            )
+        else:
+            data0, removed_data, reporte_dimensiones = enriquecer(data0, orders_data, base_utec_data, base_ceco_data, reparto_overhead)
+
+        # 'Año' y 'Mes' del presupuesto como enteros pequeños, igual que 'Ejercicio' y 'Período' del gasto
+        budget_data = compactar_presupuesto(budget_data)
+
+        # Cubo precalculado para las consultas de la página de Gasto
+        with etapa('cubo', filas_entrada=len(data0)) as registro_cubo:
+            cubo = construir_cubo(data0, budget_data, celdas_gasto)
+            registro_cubo['filas_salida'] = len(cubo.gasto)
+        registro['filas_salida'] = len(data0)
+
+    return DatosMonitor(data0, removed_data, budget_data, orders_data, reporte_dimensiones, cubo, tiempos_carga)
+
+
+# Particiones por año de una versión de los datos: el pipeline completo solo corre si aún no están en disco.
+# Esa primera construcción enriquece toda la historia: la eliminación de pares ignora 'Ejercicio' (una reversa de
+# un año puede anular un gasto de otro), así que por año cambiarían los resultados. Con BUDGET_MONITOR_INCREMENTAL=1
+# solo se procesan los meses nuevos
+def preparar_almacen(urls, reparto_overhead=None) -> AlmacenParticiones:
+    directorio = directorio_particiones(urls, reparto_overhead)
+    if not (directorio / 'manifiesto.json').exists():
+        escribir_particiones(construir_datos(*urls, reparto_overhead), directorio)
+    return AlmacenParticiones(directorio)
+
+
+# Datos publicados de una versión, mapeados en memoria: el pipeline solo corre si ningún proceso los publicó aún
+def preparar_compartido(urls, reparto_overhead=None) -> DatosMonitor:
+    directorio = publicar(urls, lambda: construir_datos(*urls, reparto_overhead), reparto_overhead)
+    tablas = leer_compartido(directorio)
+    return DatosMonitor(tablas['gasto'], None, tablas['presupuesto'], tablas['ordenes'], cubo=tablas['cubo'], mayores=tablas['mayores'])
+
+
+# Dónde viven los datos de las consultas: 'particiones' (BUDGET_MONITOR_PARTICIONADO=1), 'compartido'
+# (BUDGET_MONITOR_COMPARTIDO=1) o 'memoria' de cada proceso
+def modo_almacenamiento():
+    if modo_particionado():
+        return 'particiones'
+    if modo_compartido():
+        return 'compartido'
+    return 'memoria'
+
+
+def crear_consultas(pagina, motor, urls, almacenamiento='memoria'):
+    """Consultas de una página ('gasto' u 'ordenes') con el motor indicado, construidas desde las fuentes.
+
+    Con 'particiones' se preparan sobre las particiones por año; las de cada selección de años se crean al pedirlas.
+    Con 'compartido' se consultan las tablas publicadas y mapeadas en memoria, comunes a todos los procesos.
+    Solo se conservan las tablas que usan las consultas (p. ej. el cubo, y no el gasto completo, en la de Gasto).
+    """
+    if almacenamiento == 'particiones':
+        def crear(almacen, years):
+            if motor == 'duckdb':
+                return ConsultasSQL(DatosMonitor(almacen.gasto(years), None, almacen.presupuesto(years), None))
+            if pagina == 'gasto':
+                return ConsultasCubo(almacen.cubo(years))
+            return ConsultasOrdenes(DatosMonitor(almacen.gasto(years), None, None, None))
+
+        return ConsultasParticionadas(preparar_almacen(urls), crear)
+
+    datos = preparar_compartido(urls) if almacenamiento == 'compartido' else construir_datos(*urls)
+    if motor == 'duckdb':
+        return ConsultasSQL(datos)
+    if pagina == 'gasto':
+        return ConsultasCubo(datos.cubo)
+    return ConsultasOrdenes(datos, datos.mayores)
+
+
+# Actualizador de las consultas de una página: uno por proceso, motor, almacenamiento y fuentes, compartido entre
+# sesiones. Su hilo revisa las fuentes y publica cada versión nueva sin que ninguna sesión espere la reconstrucción
+@st.cache_resource(show_spinner=False)
+def actualizador(pagina, motor, almacenamiento, *urls) -> Actualizador:
+    return Actualizador(lambda: version_fuentes(urls), lambda: crear_consultas(pagina, motor, urls, almacenamiento))
+
+
+def version_datos(pagina, *urls) -> VersionDatos:
+    """Versión vigente de los datos de una página con el motor configurado (BUDGET_MONITOR_MOTOR), sobre los datos
+    del proceso, los publicados para todos los procesos (BUDGET_MONITOR_COMPARTIDO=1) o las particiones de los
+    años seleccionados (BUDGET_MONITOR_PARTICIONADO=1)."""
+    vigente = actualizador(pagina, motor_consultas(), modo_almacenamiento(), *urls)
+    if vigente.listo:
+        return vigente.vigente()
+    with st.spinner("Cargando y procesando datos..."):
+        return vigente.vigente()
+
+
+# Consultas vigentes de cada página
+def consultas_gasto(*urls):
+    return version_datos('gasto', *urls).consultas
+
+
+def consultas_ordenes(*urls):
+    return version_datos('ordenes', *urls).consultas
+
+
+def precalentar(paginas=tuple(FUENTES_PAGINAS)):
+    """Construye la versión vigente de cada página con la configuración actual, sin sesión ni spinner.
+
+    Se llama en segundo plano desde la portada: al abrir una página, su versión ya está lista o en construcción
+    (y la sesión espera esa misma construcción). Un error solo se registra; la página lo mostrará al abrirla.
+    """
+    for pagina in paginas:
+        try:
+            actualizador(pagina, motor_consultas(), modo_almacenamiento(), *ubicaciones(FUENTES_PAGINAS[pagina])).vigente()
+        except Exception:
+            logger.exception("No se pudo precalentar los datos de la página %s", pagina)
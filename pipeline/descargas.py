@@ -0,0 +1,85 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+# Directorio local donde se guardan los cuerpos descargados y sus validadores HTTP
+DIRECTORIO_DESCARGAS = Path(os.environ.get('BUDGET_MONITOR_DESCARGAS', Path(__file__).resolve().parent.parent / '.descargas'))
+
+
+def _rutas(url: str, directorio: Path = None):
+    base = Path(directorio or DIRECTORIO_DESCARGAS) / hashlib.sha1(url.encode('utf-8')).hexdigest()[:20]
+    return base.with_suffix('.body'), base.with_suffix('.json')
+
+
+def _escribir_atomico(ruta: Path, contenido: bytes):
+    temporal = ruta.with_suffix(f"{ruta.suffix}.{os.getpid()}.{threading.get_ident()}.tmp")
+    temporal.write_bytes(contenido)
+    os.replace(temporal, ruta)
+
+
+def descargar(url: str, directorio: Path = None, timeout: float = 60) -> bytes:
+    """Descarga `url` revalidando con ETag/Last-Modified la copia en disco.
+
+    Si el servidor responde 304 se devuelve el cuerpo guardado sin volver a transferirlo.
+    Si no hay conexión y existe una copia previa, se usa esa copia.
+    """
+    cuerpo, metadatos = _rutas(url, directorio)
+    cabeceras = {}
+    if cuerpo.exists() and metadatos.exists():
+        validadores = json.loads(metadatos.read_text())
+        if validadores.get('etag'):
+            cabeceras['If-None-Match'] = validadores['etag']
+        if validadores.get('last_modified'):
+            cabeceras['If-Modified-Since'] = validadores['last_modified']
+
+    try:
+        with urlopen(Request(url, headers=cabeceras), timeout=timeout) as respuesta:
+            contenido = respuesta.read()
+            validadores = {
+                'url': url,
+                'etag': respuesta.headers.get('ETag'),
+                'last_modified': respuesta.headers.get('Last-Modified'),
+            }
+    except HTTPError as error:
+        if error.code == 304 and cabeceras:
+            return cuerpo.read_bytes()
+        raise
+    except URLError:
+        if cuerpo.exists():
+            return cuerpo.read_bytes()
+        raise
+
+    cuerpo.parent.mkdir(parents=True, exist_ok=True)
+    _escribir_atomico(cuerpo, contenido)
+    _escribir_atomico(metadatos, json.dumps(validadores).encode('utf-8'))
+    return contenido
+
+
+def _validadores_guardados(url: str, directorio: Path = None) -> dict:
+    _, metadatos = _rutas(url, directorio)
+    return json.loads(metadatos.read_text()) if metadatos.exists() else {}
+
+
+def validadores(url: str, directorio: Path = None, timeout: float = 10) -> dict:
+    """ETag y Last-Modified actuales de `url`, con una petición HEAD (sin descargar el cuerpo).
+
+    Si el servidor rechaza HEAD (p. ej. 403 o 405) se revalida con un GET condicional (`descargar`), que además
+    agrega el hash del cuerpo en 'contenido'; así un cambio se detecta aunque el servidor no envíe validadores.
+    Si no hay conexión se devuelven los validadores de la última descarga (o un dict vacío si no la hay).
+    """
+    try:
+        with urlopen(Request(url, method='HEAD'), timeout=timeout) as respuesta:
+            return {
+                'url': url,
+                'etag': respuesta.headers.get('ETag'),
+                'last_modified': respuesta.headers.get('Last-Modified'),
+            }
+    except HTTPError:
+        contenido = descargar(url, directorio)
+        return {**_validadores_guardados(url, directorio), 'contenido': hashlib.sha1(contenido).hexdigest()[:20]}
+    except URLError:
+        return _validadores_guardados(url, directorio)
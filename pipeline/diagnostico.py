@@ -0,0 +1,180 @@
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+# Registros recientes de todas las sesiones del proceso (para el panel) y logger de líneas JSON
+REGISTROS = deque(maxlen=1000)
+_candado = threading.Lock()
+_local = threading.local()
+_secuencia = itertools.count()
+logger = logging.getLogger('budget_monitor.diagnostico')
+
+
+# Diagnóstico activo (BUDGET_MONITOR_DIAGNOSTICO=1): traza memoria con tracemalloc y muestra siempre el panel.
+# Sin activarlo se registran igual el tiempo y las filas, y el panel se abre con ?diagnostico=1 en la URL.
+def diagnostico_activo():
+    return os.environ.get('BUDGET_MONITOR_DIAGNOSTICO', '').lower() in ('1', 'true', 'si', 'sí')
+
+
+def _configurar():
+    if diagnostico_activo() and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    ruta = os.environ.get('BUDGET_MONITOR_DIAGNOSTICO_LOG')
+    if ruta and not logger.handlers:
+        manejador = logging.FileHandler(ruta, encoding='utf-8')
+        manejador.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(manejador)
+        logger.setLevel(logging.INFO)
+
+
+_configurar()
+
+
+def _pila():
+    if not hasattr(_local, 'pila'):
+        _local.pila = []
+    return _local.pila
+
+
+def _abrir(nombre, ambito, filas_entrada):
+    pila = _pila()
+    registro = {
+        'etapa': nombre,
+        'secuencia': next(_secuencia),
+        'ambito': ambito,
+        'ejecucion': pila[0]['registro']['ejecucion'] if pila else getattr(_local, 'ejecucion', None) or uuid.uuid4().hex[:8],
+        'padre': pila[-1]['registro']['etapa'] if pila else getattr(_local, 'padre', None),
+        'inicio': datetime.now().isoformat(timespec='milliseconds'),
+        'segundos': None,
+        'filas_entrada': filas_entrada,
+        'filas_salida': None,
+        'memoria_pico_mb': None,
+    }
+    marco = {'registro': registro, 'inicio': time.perf_counter(), 'memoria': None, 'pico': 0}
+    if tracemalloc.is_tracing():
+        # El pico es global: se guarda el de la etapa contenedora antes de reiniciarlo
+        actual, pico = tracemalloc.get_traced_memory()
+        if pila:
+            pila[-1]['pico'] = max(pila[-1]['pico'], pico)
+        tracemalloc.reset_peak()
+        marco['memoria'] = actual
+    pila.append(marco)
+    return marco
+
+
+def _cerrar(marco):
+    pila = _pila()
+    if marco in pila:
+        pila.remove(marco)
+    registro = marco['registro']
+    registro['segundos'] = time.perf_counter() - marco['inicio']
+    if marco['memoria'] is not None and tracemalloc.is_tracing():
+        pico = max(marco['pico'], tracemalloc.get_traced_memory()[1])
+        registro['memoria_pico_mb'] = (pico - marco['memoria']) / 2**20
+        if pila:
+            pila[-1]['pico'] = max(pila[-1]['pico'], pico)
+    with _candado:
+        REGISTROS.append(registro)
+    logger.info(json.dumps(registro, default=str, ensure_ascii=False))
+
+
+@contextmanager
+def etapa(nombre, filas_entrada=None, ambito='pipeline'):
+    """Mide tiempo, filas y pico de memoria de un bloque; el registro admite 'filas_salida'.
+
+    Las etapas anidadas quedan asociadas a la etapa que las contiene ('padre') y a la misma ejecución.
+    Con varias sesiones a la vez el pico de tracemalloc incluye las asignaciones de los otros hilos.
+    """
+    marco = _abrir(nombre, ambito, filas_entrada)
+    try:
+        yield marco['registro']
+    finally:
+        _cerrar(marco)
+
+
+def contexto():
+    """Ejecución y etapa actuales del hilo, para continuar el registro desde otro hilo."""
+    pila = _pila()
+    if pila:
+        return {'ejecucion': pila[0]['registro']['ejecucion'], 'padre': pila[-1]['registro']['etapa']}
+    return {'ejecucion': getattr(_local, 'ejecucion', None), 'padre': getattr(_local, 'padre', None)}
+
+
+@contextmanager
+def en_contexto(ctx):
+    """Registra las etapas de este hilo (p. ej. un worker) como hijas del contexto de otro hilo."""
+    anterior = getattr(_local, 'ejecucion', None), getattr(_local, 'padre', None)
+    _local.ejecucion, _local.padre = ctx['ejecucion'], ctx['padre']
+    try:
+        yield
+    finally:
+        _local.ejecucion, _local.padre = anterior
+
+
+# Secciones de página: cada llamada cierra la sección anterior, así el script no necesita bloques `with`
+def iniciar_pagina(pagina):
+    _local.pila = []
+    _local.ejecucion = uuid.uuid4().hex[:8]
+    _local.pagina = pagina
+    _local.seccion = None
+
+
+def seccion(nombre):
+    if getattr(_local, 'seccion', None) is not None:
+        _cerrar(_local.seccion)
+    _local.seccion = _abrir(f"{getattr(_local, 'pagina', '')}/{nombre}", 'pagina', None)
+
+
+# Cerrar la sección abierta (al final de la página o de un fragmento que se vuelve a ejecutar solo)
+def cerrar_seccion():
+    if getattr(_local, 'seccion', None) is not None:
+        _cerrar(_local.seccion)
+        _local.seccion = None
+
+
+def registros(ejecucion=None):
+    """Registros recientes como DataFrame (de una ejecución, si se indica)."""
+    with _candado:
+        datos = [r for r in REGISTROS if ejecucion is None or r['ejecucion'] == ejecucion]
+    return pd.DataFrame(datos, columns=[
+        'etapa', 'secuencia', 'ambito', 'ejecucion', 'padre', 'inicio', 'segundos', 'filas_entrada', 'filas_salida', 'memoria_pico_mb',
+    ])
+
+
+def _tabla(data):
+    data = data.sort_values('secuencia')
+    return data[['etapa', 'segundos', 'filas_entrada', 'filas_salida', 'memoria_pico_mb']].reset_index(drop=True)
+
+
+# Panel "Diagnóstico" en la barra lateral: secciones de esta ejecución y, si los datos venían de la caché,
+# la última construcción del pipeline en el proceso
+def mostrar_diagnostico():
+    cerrar_seccion()
+    if not (diagnostico_activo() or st.query_params.get('diagnostico') == '1'):
+        return
+
+    ejecucion = getattr(_local, 'ejecucion', None)
+    todos = registros()
+    construcciones = todos[todos['etapa'].str.startswith('construir_datos')]
+    with st.sidebar.expander("Diagnóstico", expanded=True):
+        actual = todos[todos['ejecucion'] == ejecucion]
+        st.caption(f"Ejecución {ejecucion}: {actual.loc[actual['padre'].isna(), 'segundos'].sum():.3f} s")
+        st.dataframe(_tabla(actual), hide_index=True)
+
+        if not construcciones.empty and ejecucion not in set(construcciones['ejecucion']):
+            ultima = construcciones.iloc[-1]
+            st.caption(f"Última construcción: {ultima['etapa']} ({ultima['inicio']}, {ultima['segundos']:.2f} s)")
+            st.dataframe(_tabla(todos[todos['ejecucion'] == ultima['ejecucion']]), hide_index=True)
+        if not tracemalloc.is_tracing():
+            st.caption("Memoria sin medir: activar con BUDGET_MONITOR_DIAGNOSTICO=1")
@@ -0,0 +1,76 @@
+import pandas as pd
+
+from pipeline.diagnostico import etapa
+
+# Atributos de la dimensión de órdenes que se copian a cada fila del gasto (los que usa la página de Órdenes)
+ATRIBUTOS_ORDEN = ['Clase de orden']
+
+
+# Índice hash de una tabla de referencia: posición de cada clave (se conserva la primera ocurrencia)
+def _indice(tabla, clave):
+    tabla = tabla.drop_duplicates(clave)
+    return pd.Index(tabla[clave]), tabla.reset_index(drop=True)
+
+
+# Tomar la columna `columna` de la tabla en las posiciones dadas (NaN donde no hubo coincidencia, posición -1)
+def _tomar(tabla, columna, posiciones):
+    return pd.api.extensions.take(tabla[columna].array, posiciones, allow_fill=True)
+
+
+# Dimensión de órdenes: índice por 'Orden' con solo 'Utec' y los atributos de ATRIBUTOS_ORDEN presentes
+def dimension_ordenes(orders_data):
+    columnas = ['Orden', 'Utec'] + [columna for columna in ATRIBUTOS_ORDEN if columna in orders_data.columns]
+    return _indice(orders_data[columnas], 'Orden')
+
+
+# Resolver Utec, Proceso y Recinto en una sola pasada:
+# Orden partner -> Utec y atributos de la orden (Base_Ordenes), Utec -> Proceso/Recinto (Base_UTEC) y, para las
+# filas que quedan sin Proceso ni Recinto, Centro de coste -> Proceso/Recinto (Base_Ceco).
+# Las columnas se asignan sobre `data0` sin merges; devuelve también cuántas filas resolvió cada fuente.
+def resolver_dimensiones(data0, orders_data, base_utec_data, base_ceco_data):
+    if 'Orden partner' not in data0.columns:
+        raise ValueError("No se encontraron las columnas necesarias para el primer mapeo")
+
+    indice_ordenes, ordenes = dimension_ordenes(orders_data)
+    indice_utec, utec = _indice(base_utec_data[['Utec', 'Proceso', 'Recinto']], 'Utec')
+    base_ceco_data = base_ceco_data[['Ceco', 'Proceso', 'Recinto']].astype(str)
+    indice_ceco, ceco = _indice(base_ceco_data, 'Ceco')
+
+    # Órdenes -> Utec y atributos de la orden
+    with etapa('utec_por_orden', filas_entrada=len(data0)):
+        posiciones = indice_ordenes.get_indexer(data0['Orden partner'])
+        por_orden = posiciones >= 0
+        for columna in ordenes.columns:
+            data0[columna] = _tomar(ordenes, columna, posiciones)
+
+    # Utec -> Proceso y Recinto
+    with etapa('proceso_por_utec', filas_entrada=len(data0)):
+        posiciones = indice_utec.get_indexer(data0['Utec'])
+        por_utec = posiciones >= 0
+        proceso = pd.Series(_tomar(utec, 'Proceso', posiciones), index=data0.index)
+        recinto = pd.Series(_tomar(utec, 'Recinto', posiciones), index=data0.index)
+
+    # Fallback Ceco para las filas sin Proceso ni Recinto
+    incompletas = (proceso.isna() & recinto.isna()).to_numpy()
+    with etapa('fallback_ceco', filas_entrada=int(incompletas.sum())):
+        posiciones = indice_ceco.get_indexer(data0.loc[incompletas, 'Centro de coste'].astype(str))
+        por_ceco = posiciones >= 0
+        proceso[incompletas] = _tomar(ceco, 'Proceso', posiciones)
+        recinto[incompletas] = _tomar(ceco, 'Recinto', posiciones)
+
+    data0['Proceso'] = proceso
+    data0['Recinto'] = recinto
+
+    reporte = {
+        'filas': len(data0),
+        'utec_por_orden': int(por_orden.sum()),
+        'proceso_por_utec': int(por_utec.sum()),
+        'proceso_por_ceco': int(por_ceco.sum()),
+        'sin_resolver': int(incompletas.sum() - por_ceco.sum()),
+        'claves_duplicadas': {
+            'Base_Ordenes': int(orders_data['Orden'].duplicated().sum()),
+            'Base_UTEC': int(base_utec_data['Utec'].duplicated().sum()),
+            'Base_Ceco': int(base_ceco_data['Ceco'].duplicated().sum()),
+        },
+    }
+    return data0, reporte
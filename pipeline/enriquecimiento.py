@@ -0,0 +1,74 @@
+import pandas as pd
+
+from pipeline.diagnostico import etapa
+from pipeline.dimensiones import resolver_dimensiones
+from pipeline.esquema import compactar_gasto, entero_compacto
+from pipeline.overhead import redistribuir_overhead
+from pipeline.pares import eliminar_pares_opuestos
+
+
+# Verificar que las columnas necesarias están presentes en los DataFrames cargados
+def verificar_columnas(orders_data, base_utec_data, base_ceco_data):
+    assert 'Orden' in orders_data.columns, "La columna 'Orden' no está presente en orders_data"
+    assert 'Utec' in orders_data.columns, "La columna 'Utec' no está presente en orders_data"
+    assert 'Utec' in base_utec_data.columns, "La columna 'Utec' no está presente en base_utec_data"
+    assert 'Proceso' in base_utec_data.columns, "La columna 'Proceso' no está presente en base_utec_data"
+    assert 'Recinto' in base_utec_data.columns, "La columna 'Recinto' no está presente en base_utec_data"
+    assert 'Ceco' in base_ceco_data.columns, "La columna 'Ceco' no está presente en base_ceco_data"
+    assert 'Proceso' in base_ceco_data.columns, "La columna 'Proceso' no está presente en base_ceco_data"
+    assert 'Recinto' in base_ceco_data.columns, "La columna 'Recinto' no está presente en base_ceco_data"
+
+
+# Función para eliminar filas con valores específicos en "Grupo_Ceco"
+def eliminar_filas_grupo_ceco(data):
+    valores_excluir = ["Abastecimiento y contratos", "Finanzas", "Servicios generales"]
+    return data[~data['Grupo_Ceco'].isin(valores_excluir)]
+
+
+# Tipos y dimensiones del gasto crudo (la columna 'id' debe venir asignada)
+def preparar_gasto(data0, orders_data, base_utec_data, base_ceco_data):
+    with etapa('tipos', filas_entrada=len(data0)):
+        # 'Ejercicio' y 'Período' como enteros pequeños y 'Valor/mon.inf.' numérico
+        data0['Ejercicio'] = entero_compacto(data0['Ejercicio'], 'int16')
+        data0['Período'] = entero_compacto(data0['Período'], 'int8')
+        data0['Valor/mon.inf.'] = pd.to_numeric(data0['Valor/mon.inf.'], errors='coerce')
+
+    # Utec, Proceso y Recinto (con fallback Ceco) en una sola pasada
+    with etapa('dimensiones', filas_entrada=len(data0)) as registro:
+        data0, reporte_dimensiones = resolver_dimensiones(data0, orders_data, base_utec_data, base_ceco_data)
+        registro['filas_salida'] = len(data0)
+    return data0, reporte_dimensiones
+
+
+# Pasos posteriores a la eliminación de pares; todos son por fila o por mes (Ejercicio, Período)
+def completar_gasto(data0, reparto_overhead=None):
+    with etapa('grupo_ceco', filas_entrada=len(data0)) as registro:
+        data0 = eliminar_filas_grupo_ceco(data0)
+        registro['filas_salida'] = len(data0)
+
+    # Limpieza y normalización de 'Centro de coste'
+    with etapa('normalizacion_ceco', filas_entrada=len(data0)):
+        data0['Centro de coste'] = data0['Centro de coste'].str.strip().str.upper()
+
+    with etapa('overhead', filas_entrada=len(data0)) as registro:
+        data0 = redistribuir_overhead(data0, reparto_overhead)
+        registro['filas_salida'] = len(data0)
+
+    # Esquema compacto: dimensiones categóricas para que filtros y agrupaciones trabajen sobre códigos
+    with etapa('esquema', filas_entrada=len(data0)):
+        return compactar_gasto(data0)
+
+
+# Pipeline completo: dimensiones, eliminación de pares opuestos, fallback Ceco y redistribución de Overhead
+def enriquecer(data0, orders_data, base_utec_data, base_ceco_data, reparto_overhead=None):
+    verificar_columnas(orders_data, base_utec_data, base_ceco_data)
+
+    data0['id'] = range(1, len(data0) + 1)
+    data0, reporte_dimensiones = preparar_gasto(data0, orders_data, base_utec_data, base_ceco_data)
+
+    with etapa('pares', filas_entrada=len(data0)) as registro:
+        data0, removed_data = eliminar_pares_opuestos(data0)
+        registro['filas_salida'] = len(data0)
+    data0 = completar_gasto(data0, reparto_overhead)
+
+    return data0, removed_data, reporte_dimensiones
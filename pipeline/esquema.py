@@ -0,0 +1,64 @@
+import pandas as pd
+
+# Columnas de dimensión del gasto enriquecido que se guardan como categóricas
+DIMENSIONES_GASTO = [
+    'Proceso', 'Recinto', 'Familia_Cuenta', 'Grupo_Ceco', 'Centro de coste', 'Clase de coste', 'Utec', 'Clase de orden',
+]
+DIMENSIONES_PRESUPUESTO = ['Proceso', 'Familia_Cuenta']
+
+
+# Convertir a un entero pequeño; si hay valores faltantes se conserva el tipo numérico original
+def entero_compacto(serie, dtype):
+    serie = pd.to_numeric(serie, errors='coerce')
+    if serie.isna().any():
+        return serie
+    return serie.astype(dtype)
+
+
+# Convertir columnas de texto a categóricas (los valores faltantes quedan como NaN)
+def categorizar(data, columnas):
+    for columna in columnas:
+        if columna in data.columns and not isinstance(data[columna].dtype, pd.CategoricalDtype):
+            data[columna] = data[columna].astype('category')
+    return data
+
+
+# Esquema compacto del gasto: Ejercicio int16, Período int8 y dimensiones categóricas
+def compactar_gasto(data0):
+    data0['Ejercicio'] = entero_compacto(data0['Ejercicio'], 'int16')
+    data0['Período'] = entero_compacto(data0['Período'], 'int8')
+    return categorizar(data0, DIMENSIONES_GASTO)
+
+
+# Concatenar partes del gasto compacto sin perder las categóricas (se unen las categorías antes de concatenar)
+def concatenar_gasto(partes):
+    for columna in DIMENSIONES_GASTO:
+        if not all(isinstance(parte[columna].dtype, pd.CategoricalDtype) for parte in partes if columna in parte.columns):
+            continue
+        categorias = partes[0][columna].cat.categories
+        for parte in partes[1:]:
+            categorias = categorias.union(parte[columna].cat.categories)
+        for parte in partes:
+            parte[columna] = parte[columna].cat.set_categories(categorias)
+    return compactar_gasto(pd.concat(partes, ignore_index=True))
+
+
+# Esquema compacto del presupuesto: Año int16, Mes int8 y dimensiones categóricas
+def compactar_presupuesto(budget_data):
+    budget_data['Año'] = entero_compacto(budget_data['Año'], 'int16')
+    budget_data['Mes'] = entero_compacto(budget_data['Mes'], 'int8')
+    return categorizar(budget_data, DIMENSIONES_PRESUPUESTO)
+
+
+# Reporte de memoria por columna: disposición con cadenas (objeto) vs. esquema compacto
+def reporte_memoria(data0):
+    columnas = [c for c in ['Ejercicio', 'Período'] + DIMENSIONES_GASTO if c in data0.columns]
+    compacto = data0[columnas]
+    objeto = compacto.astype(str).astype(object)
+    reporte = pd.DataFrame({
+        'objeto_bytes': objeto.memory_usage(deep=True, index=False),
+        'compacto_bytes': compacto.memory_usage(deep=True, index=False),
+    })
+    reporte.loc['Total'] = reporte.sum()
+    reporte['reduccion'] = 1 - reporte['compacto_bytes'] / reporte['objeto_bytes']
+    return reporte
@@ -0,0 +1,196 @@
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pcsv
+
+from pipeline.descargas import descargar
+from pipeline.diagnostico import contexto, en_contexto, etapa
+from pipeline.snapshots import cargar_con_snapshot, huella, nombre_fuente
+
+# Definimos las URLs por defecto de los archivos de referencia
+FUENTES = {
+    'data0': 'https://streamlitmaps.s3.amazonaws.com/Data_0824.csv',
+    'data0_ordenes': 'https://streamlitmaps.s3.amazonaws.com/Data_0824_2.csv',
+    'presupuesto': 'https://streamlitmaps.s3.amazonaws.com/Base_Presupuesto_3.csv',
+    'ordenes': 'https://streamlitmaps.s3.amazonaws.com/Base_Ordenes_0824.csv',
+    'utec': 'https://streamlitmaps.s3.amazonaws.com/Base_UTEC_BudgetVersion.csv',
+    'ceco': 'https://streamlitmaps.s3.amazonaws.com/Base_Ceco_3.csv',
+}
+
+# Esquema declarado de cada fuente: columnas que usa la app con su tipo y columnas con separador de miles.
+# Solo se leen estas columnas; si un archivo no calza con su esquema se lee como antes (todas las columnas, tipos inferidos).
+ESQUEMAS = {
+    'data0': {
+        'columnas': {
+            'Ejercicio': 'int16',
+            'Período': 'int8',
+            'Clase de coste': 'int64',
+            'Centro de coste': 'string',
+            'Orden partner': 'float64',
+            'Grupo_Ceco': 'string',
+            'Familia_Cuenta': 'string',
+            'Denominación del objeto': 'string',
+            'Fe.contabilización': 'string',
+            'Valor/mon.inf.': 'float64',
+        },
+        'miles': ['Valor/mon.inf.'],
+    },
+    'presupuesto': {
+        'columnas': {'Año': 'int16', 'Mes': 'int8', 'Proceso': 'string', 'Familia_Cuenta': 'string', 'Presupuesto': 'float64'},
+    },
+    'ordenes': {
+        'columnas': {'Orden': 'int64', 'Utec': 'string', 'Clase de orden': 'string'},
+    },
+    'utec': {
+        'columnas': {'Utec': 'string', 'Proceso': 'string', 'Recinto': 'string'},
+    },
+    'ceco': {
+        'columnas': {'Ceco': 'string', 'Proceso': 'string', 'Recinto': 'string'},
+    },
+}
+ESQUEMAS['data0_ordenes'] = ESQUEMAS['data0']
+
+# Tamaño de bloque del lector CSV: el archivo se convierte por bloques, sin un DataFrame intermedio de texto
+BLOQUE_CSV = 16 * 2**20
+
+# Máximo de archivos que se descargan y parsean a la vez
+MAX_HILOS_CARGA = int(os.environ.get('BUDGET_MONITOR_HILOS_CARGA', 5))
+
+DATA0_URL = FUENTES['data0']
+DATA0_ORDENES_URL = FUENTES['data0_ordenes']
+BUDGET_URL = FUENTES['presupuesto']
+ORDERS_URL = FUENTES['ordenes']
+BASE_UTEC_URL = FUENTES['utec']
+BASE_CECO_URL = FUENTES['ceco']
+
+
+# Ubicación configurada de un conjunto de datos:
+# - BUDGET_MONITOR_<NOMBRE> (p. ej. BUDGET_MONITOR_DATA0) con una URL, un archivo o un directorio
+# - BUDGET_MONITOR_DIR_DATOS con un directorio local que contiene todos los archivos
+# - en otro caso, la URL por defecto
+def ubicacion(nombre):
+    archivo = Path(urlparse(FUENTES[nombre]).path).name
+    valor = os.environ.get(f'BUDGET_MONITOR_{nombre.upper()}') or os.environ.get('BUDGET_MONITOR_DIR_DATOS')
+    if not valor:
+        return FUENTES[nombre]
+    if '://' not in valor and Path(valor).is_dir():
+        return str(Path(valor) / archivo)
+    return valor
+
+
+# Ubicaciones de las cinco fuentes de una página, en el orden que espera `construir_datos`
+def ubicaciones(data0='data0'):
+    return tuple(ubicacion(nombre) for nombre in (data0, 'presupuesto', 'ordenes', 'utec', 'ceco'))
+
+
+# Leer el contenido crudo de una fuente: las URLs pasan por la caché HTTP en disco
+def leer_bytes(url):
+    if '://' in str(url):
+        return descargar(url)
+    return Path(url).read_bytes()
+
+
+# Parsear el CSV de referencia (ISO-8859-1, separado por ';')
+def parsear_csv(contenido):
+    data = pd.read_csv(io.BytesIO(contenido), encoding='ISO-8859-1', sep=';')
+    if 'Valor/mon.inf.' in data.columns:
+        data['Valor/mon.inf.'] = pd.to_numeric(data['Valor/mon.inf.'].str.replace(',', ''), errors='coerce').fillna(0)
+    return data
+
+
+# Columna con separador de miles a número: se quitan las comas en Arrow; lo que no es número queda en 0
+def _numero_con_miles(columna):
+    texto = pc.replace_substring(columna, ',', '')
+    try:
+        numeros = pc.cast(texto, pa.float64())
+    except pa.ArrowInvalid:
+        numeros = pa.array(pd.to_numeric(texto.to_pandas(), errors='coerce'), type=pa.float64())
+    return pc.fill_null(numeros, 0.0)
+
+
+# Parsear según el esquema: solo las columnas declaradas, con tipos fijos, leyendo por bloques con Arrow
+def parsear_con_esquema(contenido, esquema):
+    columnas = esquema['columnas']
+    miles = set(esquema.get('miles', []))
+    tipos = {nombre: pa.string() if nombre in miles else pa.type_for_alias(tipo) for nombre, tipo in columnas.items()}
+    lector = pcsv.open_csv(
+        io.BytesIO(contenido),
+        read_options=pcsv.ReadOptions(encoding='ISO-8859-1', block_size=BLOQUE_CSV),
+        parse_options=pcsv.ParseOptions(delimiter=';'),
+        convert_options=pcsv.ConvertOptions(include_columns=list(columnas), column_types=tipos, strings_can_be_null=True),
+    )
+    bloques = []
+    for bloque in lector:
+        for nombre in miles:
+            i = bloque.schema.get_field_index(nombre)
+            bloque = bloque.set_column(i, nombre, _numero_con_miles(bloque.column(i)))
+        bloques.append(bloque)
+    tabla = pa.Table.from_batches(bloques) if bloques else lector.schema.empty_table()
+    return tabla.to_pandas(split_blocks=True, self_destruct=True)
+
+
+# Parsear una fuente con su esquema; si el archivo no calza (faltan columnas, tipos distintos) se usa el parseo general
+def parsear_fuente(contenido, esquema=None):
+    if esquema is None:
+        return parsear_csv(contenido)
+    try:
+        return parsear_con_esquema(contenido, esquema)
+    except (pa.ArrowInvalid, pa.ArrowKeyError, pa.ArrowTypeError):
+        return parsear_csv(contenido)
+
+
+# Función para cargar el archivo de referencia: desde el snapshot columnar si el contenido no cambió.
+# Con `esquema` se leen solo sus columnas; la versión del esquema forma parte de la clave del snapshot.
+def load_data(url, esquema=None):
+    with etapa(f"carga {Path(urlparse(str(url)).path).name}") as registro:
+        version = huella(repr(esquema).encode('utf-8'))[:8] if esquema else ''
+        data = cargar_con_snapshot(
+            leer_bytes(url), lambda contenido: parsear_fuente(contenido, esquema), version=version, fuente=nombre_fuente(url),
+        )
+        registro['filas_salida'] = len(data)
+    return data
+
+
+class ErrorCarga(ValueError):
+    """No se pudo cargar uno o más conjuntos de datos; `errores` tiene la excepción de cada uno."""
+
+    def __init__(self, errores):
+        self.errores = errores
+        detalle = "; ".join(f"{nombre}: {error}" for nombre, error in errores.items())
+        super().__init__(f"No se pudieron cargar los datos ({detalle})")
+
+
+# Cargar varias fuentes a la vez con un pool de hilos acotado: la descarga, la lectura del snapshot y el
+# parseo liberan el GIL, así que el arranque en frío tarda aproximadamente lo que el archivo más lento.
+# Cada fuente se parsea con el esquema de su nombre en `esquemas` (ESQUEMAS por defecto).
+# Devuelve ({nombre: DataFrame}, {nombre: segundos}); si alguna falla se informan todas las que fallaron.
+def cargar_fuentes(urls, max_hilos=None, esquemas=None):
+    ctx = contexto()
+    esquemas = ESQUEMAS if esquemas is None else esquemas
+
+    def cargar(url, esquema):
+        with en_contexto(ctx):
+            inicio = time.perf_counter()
+            data = load_data(url, esquema)
+            return data, time.perf_counter() - inicio
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_hilos or MAX_HILOS_CARGA, len(urls)))) as pool:
+        futuros = {nombre: pool.submit(cargar, url, esquemas.get(nombre)) for nombre, url in urls.items()}
+
+    datos, tiempos, errores = {}, {}, {}
+    for nombre, futuro in futuros.items():
+        try:
+            datos[nombre], tiempos[nombre] = futuro.result()
+        except Exception as error:
+            errores[nombre] = error
+    if errores:
+        raise ErrorCarga(errores) from next(iter(errores.values()))
+    return datos, tiempos
+
@@ -0,0 +1,293 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from pipeline.cubo import actualizar_celdas, agregar_gasto
+from pipeline.diagnostico import etapa
+from pipeline.dimensiones import ATRIBUTOS_ORDEN
+from pipeline.enriquecimiento import completar_gasto, enriquecer, preparar_gasto, verificar_columnas
+from pipeline.esquema import concatenar_gasto
+from pipeline.overhead import REPARTO_OVERHEAD
+from pipeline.pares import CLAVES_PARES, emparejar_opuestos
+from pipeline.snapshots import escribir_snapshot, huella, leer_snapshot, nombre_fuente
+
+# Directorio del estado persistido de la ingesta incremental
+DIRECTORIO_INCREMENTAL = Path(os.environ.get('BUDGET_MONITOR_ESTADO', Path(__file__).resolve().parent.parent / '.incremental'))
+
+# Tablas del estado (una por archivo Arrow):
+# - base: filas conservadas tras la eliminación de pares (antes del filtro de Grupo_Ceco y del Overhead)
+# - removidas: filas eliminadas por pares opuestos
+# - pendientes: 'id' de los positivos que aún pueden anular reversas de meses posteriores
+# - gasto: gasto enriquecido final, y celdas: su agregación para el cubo
+TABLAS_ESTADO = ['base', 'removidas', 'pendientes', 'gasto', 'celdas']
+
+
+# Activar la ingesta incremental desde el entorno (BUDGET_MONITOR_INCREMENTAL=1)
+def modo_incremental():
+    return os.environ.get('BUDGET_MONITOR_INCREMENTAL', '').lower() in ('1', 'true', 'si', 'sí')
+
+
+# Subdirectorio del estado de un extracto: el nombre sin el mes (Data_0824 y Data_0924 comparten estado)
+def directorio_estado(data0_url, directorio=None):
+    return Path(directorio or DIRECTORIO_INCREMENTAL) / nombre_fuente(data0_url)
+
+
+def _huella_tabla(data):
+    return str(pd.util.hash_pandas_object(data, index=False).sum())
+
+
+# Huella por mes (Ejercicio, Período) del contenido del archivo crudo, fila a fila y en el orden del archivo,
+# para detectar meses nuevos y cualquier cambio en la historia (aunque el mes conserve su cantidad de filas)
+def _huellas_por_mes(data0):
+    filas = pd.util.hash_pandas_object(data0, index=False).to_numpy()
+    grupos = data0.groupby(['Ejercicio', 'Período']).indices
+    return {f"{ejercicio}-{periodo}": huella(filas[posiciones].tobytes()) for (ejercicio, periodo), posiciones in grupos.items()}
+
+
+# Huella de la secuencia de meses de las filas, en el orden del archivo: con las huellas por mes, asegura que las
+# filas ya ingeridas están en el mismo orden que en el archivo anterior (y que sus posiciones se pueden reasignar)
+def _huella_orden(data0):
+    return huella(pd.util.hash_pandas_object(data0[['Ejercicio', 'Período']], index=False).to_numpy().tobytes())
+
+
+# 'id' de las filas ya ingeridas según su posición en el archivo nuevo (`posiciones`, de 1 en adelante y en el
+# mismo orden que en el archivo anterior): coinciden con los de una reconstrucción completa aunque los meses
+# nuevos no estén al final. Las filas sin 'id' (p. ej. las del reparto de Overhead) quedan igual
+def _renumerar(tabla, posiciones):
+    ids = tabla['id'].to_numpy(copy=True)
+    con_id = ~np.isnan(ids) if ids.dtype.kind == 'f' else np.ones(len(ids), dtype=bool)
+    ids[con_id] = posiciones[ids[con_id].astype('int64') - 1]
+    return tabla.assign(id=ids)
+
+
+def _en_grupos(data, grupos):
+    return pd.MultiIndex.from_frame(data[CLAVES_PARES]).isin(grupos)
+
+
+def _meses(data):
+    return pd.MultiIndex.from_frame(data[['Ejercicio', 'Período']].drop_duplicates())
+
+
+def leer_estado(directorio=None):
+    """Devuelve (metadatos, tablas) del estado incremental, o None si no existe o está incompleto."""
+    directorio = Path(directorio or DIRECTORIO_INCREMENTAL)
+    ruta_meta = directorio / 'meta.json'
+    if not ruta_meta.exists():
+        return None
+    meta = json.loads(ruta_meta.read_text())
+    tablas = {nombre: leer_snapshot(nombre, directorio) for nombre in TABLAS_ESTADO}
+    if any(tabla is None for tabla in tablas.values()):
+        return None
+    return meta, tablas
+
+
+def guardar_estado(meta, tablas, directorio=None):
+    """Guarda las tablas del estado y al final los metadatos; sin metadatos el estado se considera inválido."""
+    directorio = Path(directorio or DIRECTORIO_INCREMENTAL)
+    ruta_meta = directorio / 'meta.json'
+    ruta_meta.unlink(missing_ok=True)
+    for nombre in TABLAS_ESTADO:
+        if not escribir_snapshot(tablas[nombre].reset_index(drop=True), nombre, directorio):
+            return False
+    temporal = ruta_meta.with_suffix(f".{os.getpid()}.tmp")
+    temporal.write_text(json.dumps(meta))
+    os.replace(temporal, ruta_meta)
+    return True
+
+
+# Reconstrucción completa: el mismo pipeline que `enriquecer`, guardando además la pila de positivos pendientes
+def reconstruir(data0, orders_data, base_utec_data, base_ceco_data, reparto_overhead=None):
+    data0['id'] = range(1, len(data0) + 1)
+    data0, reporte_dimensiones = preparar_gasto(data0, orders_data, base_utec_data, base_ceco_data)
+
+    with etapa('pares', filas_entrada=len(data0)) as registro:
+        orden, eliminadas, pendientes = emparejar_opuestos(data0)
+        base = data0.iloc[orden[~eliminadas[orden]]]
+        removidas = data0.iloc[orden[eliminadas[orden]]]
+        registro['filas_salida'] = len(base)
+    gasto = completar_gasto(base.copy(), reparto_overhead)
+
+    tablas = {
+        'base': base,
+        'removidas': removidas,
+        'pendientes': data0.loc[pendientes, ['id']],
+        'gasto': gasto,
+        'celdas': agregar_gasto(gasto),
+    }
+    return tablas, reporte_dimensiones
+
+
+# Eliminación de pares de las filas nuevas contra el estado persistido
+#
+# En el pipeline completo las filas de un grupo se procesan por 'Período' y luego por orden del archivo.
+# - Si toda la historia del grupo es de períodos anteriores a las filas nuevas, basta con continuar
+#   desde su pila de positivos pendientes: no hace falta repetir la historia.
+# - Si no (p. ej. enero frente a meses 2-12 del año anterior, porque el orden ignora 'Ejercicio'),
+#   el grupo se reprocesa completo con sus filas conservadas, removidas y nuevas.
+def _emparejar_incremental(tablas, nuevas):
+    base, removidas, pendientes = tablas['base'], tablas['removidas'], tablas['pendientes']
+    nuevas = nuevas.dropna(subset=CLAVES_PARES)
+
+    historia = pd.concat([base[CLAVES_PARES + ['Período']], removidas[CLAVES_PARES + ['Período']]])
+    ultimo_periodo = historia.groupby(CLAVES_PARES)['Período'].max()
+    primer_periodo = nuevas.groupby(CLAVES_PARES)['Período'].min()
+    solapados = ultimo_periodo.reindex(primer_periodo.index) >= primer_periodo
+    grupos_nuevos = primer_periodo.index
+    grupos_repetir = primer_periodo.index[solapados.to_numpy()]
+
+    # Filas que vuelven a pasar por el emparejamiento
+    es_pendiente = base['id'].isin(pendientes['id'])
+    en_nuevos = _en_grupos(base, grupos_nuevos)
+    repetir_base = _en_grupos(base, grupos_repetir)
+    repetir_removidas = _en_grupos(removidas, grupos_repetir)
+    entrada_base = base[repetir_base | (en_nuevos & es_pendiente)]
+    entrada = pd.concat([entrada_base, removidas[repetir_removidas], nuevas], ignore_index=True)
+    entrada = entrada.sort_values('id', kind='stable', ignore_index=True)
+
+    orden, eliminadas, pila = emparejar_opuestos(entrada)
+    conservadas = entrada.iloc[orden[~eliminadas[orden]]]
+    eliminadas_df = entrada.iloc[orden[eliminadas[orden]]]
+
+    # Estado actualizado: se reemplazan las filas que pasaron por el emparejamiento
+    ids_entrada = entrada['id']
+    base_nueva = pd.concat([base[~base['id'].isin(ids_entrada)], conservadas], ignore_index=True)
+    removidas_nueva = pd.concat([removidas[~removidas['id'].isin(ids_entrada)], eliminadas_df], ignore_index=True)
+    pendientes_nueva = pd.concat(
+        [pendientes[~pendientes['id'].isin(ids_entrada)], entrada.loc[pila, ['id']]], ignore_index=True,
+    )
+
+    # Meses cuyo gasto cambió: los de las filas nuevas y los de filas antiguas que cambiaron de estado
+    cambiadas = pd.concat([
+        entrada_base[entrada_base['id'].isin(eliminadas_df['id'])],
+        removidas[repetir_removidas & removidas['id'].isin(conservadas['id'])],
+        nuevas,
+    ])
+    estadisticas = {
+        'filas_nuevas': len(nuevas),
+        'grupos_continuados': len(grupos_nuevos) - len(grupos_repetir),
+        'grupos_reprocesados': len(grupos_repetir),
+        'filas_emparejadas': len(entrada),
+    }
+    return base_nueva, removidas_nueva, pendientes_nueva, _meses(cambiadas), estadisticas
+
+
+def ingerir(data0, orders_data, base_utec_data, base_ceco_data, reparto_overhead=None, directorio=None):
+    """Enriquece el gasto procesando solo los meses nuevos respecto del estado guardado.
+
+    `data0` es el archivo completo del mes (con toda la historia). Si no hay estado, si cambiaron las
+    tablas de referencia, el reparto o los atributos de orden, o si la historia ya ingerida cambió (el
+    contenido de algún mes o el orden de sus filas), se reconstruye todo.
+    Devuelve (data0, removed_data, reporte_dimensiones, celdas_gasto).
+    """
+    verificar_columnas(orders_data, base_utec_data, base_ceco_data)
+    reparto = REPARTO_OVERHEAD if reparto_overhead is None else reparto_overhead
+    referencias = '-'.join(_huella_tabla(tabla) for tabla in (orders_data, base_utec_data, base_ceco_data))
+
+    data0['Ejercicio'] = pd.to_numeric(data0['Ejercicio'], errors='coerce')
+    data0['Período'] = pd.to_numeric(data0['Período'], errors='coerce')
+    huellas_por_mes = _huellas_por_mes(data0)
+    meta_nueva = {
+        'referencias': referencias,
+        'reparto': reparto,
+        'atributos_orden': ATRIBUTOS_ORDEN,
+        'huellas_por_mes': huellas_por_mes,
+        'huella_orden': _huella_orden(data0),
+    }
+
+    # Filas de meses aún no ingeridos. Los meses se comparan como pares (Ejercicio, Período), igual que en
+    # `_meses`: una clave aritmética desborda los tipos pequeños del esquema (int16 y int8)
+    estado = leer_estado(directorio)
+    es_nueva = None
+    if estado is not None and 'huellas_por_mes' in estado[0]:
+        ingeridos = pd.MultiIndex.from_tuples(
+            [tuple(int(valor) for valor in mes.split('-')) for mes in estado[0]['huellas_por_mes']], names=['Ejercicio', 'Período'],
+        )
+        es_nueva = ~pd.MultiIndex.from_frame(data0[['Ejercicio', 'Período']]).isin(ingeridos)
+    historia_intacta = es_nueva is not None and all(
+        huellas_por_mes.get(mes) == valor for mes, valor in estado[0]['huellas_por_mes'].items()
+    ) and _huella_orden(data0[~es_nueva]) == estado[0].get('huella_orden')
+    sin_faltantes = not data0[['Ejercicio', 'Período']].isna().any().any()
+    if not (
+        historia_intacta and sin_faltantes
+        and estado[0]['referencias'] == referencias and estado[0]['reparto'] == reparto
+        and estado[0].get('atributos_orden') == ATRIBUTOS_ORDEN
+    ):
+        tablas, reporte_dimensiones = reconstruir(data0, orders_data, base_utec_data, base_ceco_data, reparto)
+        meta_nueva['reporte_dimensiones'] = _combinar_reportes({}, reporte_dimensiones)
+        meta_nueva['ultima_ingesta'] = {'modo': 'completa', 'filas': len(data0)}
+        guardar_estado(meta_nueva, tablas, directorio)
+        return tablas['gasto'], tablas['removidas'], reporte_dimensiones, tablas['celdas']
+
+    meta, tablas = estado
+    if not es_nueva.any():
+        return tablas['gasto'], tablas['removidas'], meta['reporte_dimensiones'], tablas['celdas']
+
+    # El 'id' de cada fila es su posición en el archivo, como en la reconstrucción completa: el desempate de
+    # los pares es el mismo en cualquier orden del archivo. Solo las filas nuevas pasan por tipos y dimensiones
+    anteriores = np.flatnonzero(~es_nueva) + 1
+    if len(anteriores) and anteriores[-1] != len(anteriores):
+        tablas = {nombre: _renumerar(tabla, anteriores) if 'id' in tabla else tabla for nombre, tabla in tablas.items()}
+    nuevas = data0[es_nueva].copy()
+    nuevas['id'] = np.flatnonzero(es_nueva) + 1
+    nuevas, reporte_nuevas = preparar_gasto(nuevas, orders_data, base_utec_data, base_ceco_data)
+
+    with etapa('pares_incremental', filas_entrada=len(nuevas)) as registro:
+        base, removidas, pendientes, meses, estadisticas = _emparejar_incremental(tablas, nuevas)
+        registro['filas_salida'] = len(base)
+
+    # Filtro de Grupo_Ceco, normalización y Overhead son por mes: solo se recalculan los meses afectados
+    en_meses = pd.MultiIndex.from_frame(base[['Ejercicio', 'Período']]).isin(meses)
+    gasto_meses = completar_gasto(base[en_meses].copy(), reparto)
+    gasto = tablas['gasto']
+    conservado = gasto[~pd.MultiIndex.from_frame(gasto[['Ejercicio', 'Período']]).isin(meses)]
+    gasto = concatenar_gasto([conservado.copy(), gasto_meses])
+    celdas = actualizar_celdas(tablas['celdas'], gasto_meses, meses)
+
+    reporte_dimensiones = _combinar_reportes(meta['reporte_dimensiones'], reporte_nuevas)
+    tablas = {'base': base, 'removidas': removidas, 'pendientes': pendientes, 'gasto': gasto, 'celdas': celdas}
+    meta_nueva['reporte_dimensiones'] = reporte_dimensiones
+    meta_nueva['ultima_ingesta'] = {'modo': 'incremental', 'meses': [f"{e}-{p}" for e, p in meses], **estadisticas}
+    guardar_estado(meta_nueva, tablas, directorio)
+    return gasto, removidas, reporte_dimensiones, celdas
+
+
+# Los conteos del reporte de dimensiones se acumulan; las claves duplicadas dependen solo de las referencias
+def _combinar_reportes(anterior, nuevo):
+    combinado = dict(anterior)
+    for clave, valor in nuevo.items():
+        if isinstance(valor, dict):
+            combinado[clave] = valor
+        else:
+            combinado[clave] = combinado.get(clave, 0) + valor
+    return json.loads(json.dumps(combinado, default=int))
+
+
+def verificar(data0, orders_data, base_utec_data, base_ceco_data, reparto_overhead=None, directorio=None):
+    """Compara el estado incremental con una reconstrucción completa del mismo archivo.
+
+    Devuelve un diccionario con las diferencias encontradas (vacío si coinciden).
+    """
+    estado = leer_estado(directorio)
+    if estado is None:
+        return {'estado': 'no existe'}
+    _, tablas = estado
+    completo, removidas, _ = enriquecer(data0, orders_data, base_utec_data, base_ceco_data, reparto_overhead)
+
+    diferencias = {}
+    if set(removidas['id']) != set(tablas['removidas']['id']):
+        diferencias['removidas'] = len(set(removidas['id']) ^ set(tablas['removidas']['id']))
+    if set(completo['id'].dropna()) != set(tablas['gasto']['id'].dropna()):
+        diferencias['filas'] = len(set(completo['id'].dropna()) ^ set(tablas['gasto']['id'].dropna()))
+
+    celdas = agregar_gasto(completo)
+    claves = [c for c in celdas.columns if c != 'Valor/mon.inf.']
+    comparacion = celdas.astype({c: object for c in claves}).merge(
+        tablas['celdas'].astype({c: object for c in claves}), on=claves, how='outer', suffixes=('_completo', '_incremental'),
+    ).fillna({'Valor/mon.inf._completo': 0, 'Valor/mon.inf._incremental': 0})
+    distintas = ~np.isclose(comparacion['Valor/mon.inf._completo'], comparacion['Valor/mon.inf._incremental'])
+    if distintas.any():
+        diferencias['celdas'] = int(distintas.sum())
+    return diferencias
@@ -0,0 +1,83 @@
+from typing import NamedTuple
+
+# Columnas de las tablas "Top 5 mayores gastos"
+COLUMNAS_TOP_GASTOS = ['Centro de coste', 'Denominación del objeto', 'Grupo_Ceco', 'Fe.contabilización', 'Valor/mon.inf.']
+
+# Máximo de gastos por partición que guarda el índice (y máximo N del explorador de la página de Órdenes)
+MAX_MAYORES = 20
+
+# Particiones del índice: los filtros de la barra lateral y el mes
+CLAVES_MAYORES = ['Ejercicio', 'Período', 'Proceso', 'Familia_Cuenta']
+
+# Agrupaciones del explorador de mayores gastos y sus columnas
+AGRUPACIONES = {
+    'Ninguna': [],
+    'Mes': ['Ejercicio', 'Mes'],
+    'Proceso': ['Proceso'],
+    'Recinto': ['Recinto'],
+    'Grupo_Ceco': ['Grupo_Ceco'],
+}
+
+
+class IndiceMayores(NamedTuple):
+    """Mayores gastos con Centro de coste precalculados por partición, una vez por versión de los datos.
+
+    `particiones` tiene, para cada conjunto de columnas extra de la partición (ninguna, 'Recinto' o 'Grupo_Ceco'),
+    los `k` mayores gastos de cada partición en orden global (monto descendente y, en los empates, orden del gasto).
+    Cualquier combinación de filtros es una unión de particiones, así que sus N mayores (N <= k) están en esas filas.
+    """
+    k: int
+    particiones: dict
+
+
+# Columnas de la tabla de mayores gastos de una agrupación: las del grupo primero y luego las del Top 5
+def columnas_mayores(agrupacion):
+    return list(dict.fromkeys(AGRUPACIONES[agrupacion] + COLUMNAS_TOP_GASTOS))
+
+
+# Columnas extra de la partición de una agrupación (las que no son ya claves del índice)
+def _extra(agrupacion):
+    return tuple(columna for columna in AGRUPACIONES[agrupacion] if columna not in CLAVES_MAYORES + ['Mes'])
+
+
+# Construir el índice sobre el gasto enriquecido; el monto se trunca a entero como en la página de Órdenes
+def construir_mayores(data0, k=MAX_MAYORES) -> IndiceMayores:
+    con_ceco = data0[data0['Centro de coste'].notna() & (data0['Centro de coste'] != '')]
+    columnas = list(dict.fromkeys(CLAVES_MAYORES + COLUMNAS_TOP_GASTOS + ['Recinto']))
+    con_ceco = con_ceco[columnas].assign(**{
+        'Valor/mon.inf.': con_ceco['Valor/mon.inf.'].astype(int),
+        'Mes': con_ceco['Período'].astype(int),
+    })
+    ordenado = con_ceco.sort_values(by='Valor/mon.inf.', ascending=False, kind='stable')
+
+    particiones = {}
+    for extra in dict.fromkeys(_extra(agrupacion) for agrupacion in AGRUPACIONES):
+        grupos = ordenado.groupby(CLAVES_MAYORES + list(extra), observed=True, dropna=False, sort=False)
+        particiones[extra] = grupos.head(k)
+    return IndiceMayores(k, particiones)
+
+
+def mayores_gastos(indice, years, procesos, familias, n=5, agrupacion='Ninguna', ultimo_mes=False):
+    """Los `n` mayores gastos con Centro de coste (por grupo de `agrupacion`) a partir del índice.
+
+    Solo se filtran y unen las listas precalculadas, sin ordenar el gasto. Con `ultimo_mes` se consideran
+    solo los gastos del último mes con gasto.
+    """
+    if n > indice.k:
+        raise ValueError(f"El índice de mayores gastos guarda como máximo {indice.k} por partición: n={n}")
+    filas = indice.particiones[_extra(agrupacion)]
+    filtrado = filas[
+        filas['Ejercicio'].isin(years) &
+        filas['Proceso'].isin(procesos) &
+        filas['Familia_Cuenta'].isin(familias) &
+        filas['Familia_Cuenta'].notna()
+    ]
+    if ultimo_mes:
+        filtrado = filtrado[filtrado['Mes'] == filtrado['Mes'].max()]
+
+    columnas = AGRUPACIONES[agrupacion]
+    if not columnas:
+        return filtrado.head(n)[COLUMNAS_TOP_GASTOS]
+    # Las filas ya están en orden global: basta tomar las primeras de cada grupo y ordenar por grupo
+    mayores = filtrado.groupby(columnas, observed=True, dropna=False, sort=False).head(n)
+    return mayores.sort_values(by=columnas, kind='stable', na_position='last')[columnas_mayores(agrupacion)]
@@ -0,0 +1,84 @@
+import pandas as pd
+
+from pipeline.mayores import COLUMNAS_TOP_GASTOS, construir_mayores, mayores_gastos
+
+
+# Gasto filtrado por la barra lateral con el 'Mes' como entero; la 'Clase de orden' ya viene resuelta del enriquecimiento
+def filtrar_gasto_ordenes(data0, years, procesos, familias):
+    filtrado = data0[
+        data0['Ejercicio'].isin(years) &
+        data0['Proceso'].isin(procesos) &
+        data0['Familia_Cuenta'].isin(familias) &
+        data0['Familia_Cuenta'].notna()
+    ]
+    return filtrado.assign(Mes=filtrado['Período'].astype(int))
+
+
+# Cantidad de órdenes y gasto por tipo de orden
+def metricas_tipo_orden(filtrado):
+    return filtrado.groupby('Clase de orden', observed=True).agg(
+        cantidad_ordenes=pd.NamedAgg(column='Orden partner', aggfunc='count'),
+        gasto=pd.NamedAgg(column='Valor/mon.inf.', aggfunc='sum'),
+    ).reset_index()
+
+
+# Gasto por mes y tipo de orden (columnas apiladas)
+def gasto_mensual_tipo_orden(filtrado):
+    return filtrado.groupby(['Mes', 'Clase de orden'], observed=True)['Valor/mon.inf.'].sum().reset_index()
+
+
+# Mayores gastos con Centro de coste (del último mes con gasto si `ultimo_mes`); los empates quedan en el orden del gasto
+def top_gastos(filtrado, ultimo_mes=False, n=5):
+    con_ceco = filtrado[filtrado['Centro de coste'].notna() & (filtrado['Centro de coste'] != '')]
+    if ultimo_mes:
+        con_ceco = con_ceco[con_ceco['Mes'] == con_ceco['Mes'].max()]
+    return con_ceco.sort_values(by='Valor/mon.inf.', ascending=False, kind='stable').head(n)[COLUMNAS_TOP_GASTOS]
+
+
+# Gasto total y gasto con OT asociada ('Orden partner' informado)
+def gasto_con_ot(filtrado):
+    return filtrado['Valor/mon.inf.'].sum(), filtrado.loc[filtrado['Orden partner'].notna(), 'Valor/mon.inf.'].sum()
+
+
+class ConsultasOrdenes:
+    """Consultas de la página de Órdenes en pandas (misma interfaz que ConsultasSQL).
+
+    El gasto se trunca a enteros y el filtrado se reutiliza mientras no cambien los filtros. Los mayores gastos
+    salen del índice precalculado `mayores` (se construye aquí si no se entrega). Un mismo objeto puede servir
+    a varias sesiones a la vez: solo se leen sus tablas.
+    """
+
+    def __init__(self, datos, mayores=None):
+        self.data0 = datos.data0.assign(**{'Valor/mon.inf.': datos.data0['Valor/mon.inf.'].astype(int)})
+        self.mayores = construir_mayores(self.data0) if mayores is None else mayores
+        self.años = self.data0['Ejercicio'].unique().tolist()
+        self.procesos = self.data0['Proceso'].unique().tolist()
+        self._filtrado = (None, None)
+
+    def _filtrar(self, years, procesos, familias):
+        clave = (tuple(years), tuple(procesos), tuple(familias))
+        # Se lee la tupla una sola vez: otra sesión puede reemplazarla mientras tanto
+        clave_actual, filtrado = self._filtrado
+        if clave_actual != clave:
+            filtrado = filtrar_gasto_ordenes(self.data0, years, procesos, familias)
+            self._filtrado = (clave, filtrado)
+        return filtrado
+
+    def metricas_tipo_orden(self, years, procesos, familias):
+        return metricas_tipo_orden(self._filtrar(years, procesos, familias))
+
+    def gasto_mensual_tipo_orden(self, years, procesos, familias):
+        return gasto_mensual_tipo_orden(self._filtrar(years, procesos, familias))
+
+    def top_gastos(self, years, procesos, familias, ultimo_mes=False, n=5):
+        return self.mayores_gastos(years, procesos, familias, n, 'Ninguna', ultimo_mes)
+
+    # Con N mayor que el del índice se ordena el gasto filtrado como antes
+    def mayores_gastos(self, years, procesos, familias, n=5, agrupacion='Ninguna', ultimo_mes=False):
+        indice = self.mayores
+        if n > indice.k:
+            indice = construir_mayores(self._filtrar(years, procesos, familias), n)
+        return mayores_gastos(indice, years, procesos, familias, n, agrupacion, ultimo_mes)
+
+    def gasto_con_ot(self, years, procesos, familias):
+        return gasto_con_ot(self._filtrar(years, procesos, familias))
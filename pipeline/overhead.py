@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+# Reparto del Overhead entre familias de cuenta (las fracciones deben sumar 1)
+REPARTO_OVERHEAD = {'Materiales': 0.5, 'Servicios': 0.5}
+
+
+# Redistribuir el gasto "Overhead" entre los procesos según su participación mensual
+def redistribuir_overhead(data0, reparto=None):
+    reparto = REPARTO_OVERHEAD if reparto is None else reparto
+    if not np.isclose(sum(reparto.values()), 1):
+        raise ValueError("Las fracciones del reparto de Overhead deben sumar 1")
+
+    es_overhead = data0['Proceso'] == 'Overhead'
+
+    # Paso 1: Calcular el gasto total mensual por proceso, excluyendo "Overhead"
+    gasto_mensual_proceso = data0[~es_overhead].groupby(['Ejercicio', 'Período', 'Proceso'])['Valor/mon.inf.'].sum().reset_index()
+
+    # Paso 2 y 3: Calcular las proporciones de cada proceso con respecto al gasto total mensual excluyendo "Overhead"
+    total_sin_overhead = gasto_mensual_proceso.groupby(['Ejercicio', 'Período'])['Valor/mon.inf.'].transform('sum')
+    gasto_mensual_proceso['Proporción'] = gasto_mensual_proceso['Valor/mon.inf.'] / total_sin_overhead
+
+    # Paso 4: Filtrar solo los datos de "Overhead"
+    gasto_overhead = data0[es_overhead].groupby(['Ejercicio', 'Período'])['Valor/mon.inf.'].sum().reset_index()
+
+    # Paso 5: Un solo join entre el Overhead mensual y las proporciones de cada proceso
+    asignacion = gasto_overhead.merge(
+        gasto_mensual_proceso[['Ejercicio', 'Período', 'Proceso', 'Proporción']],
+        on=['Ejercicio', 'Período'],
+    )
+    if asignacion.empty:
+        return data0[~es_overhead]
+
+    # Cada proceso recibe una fila por familia de cuenta, en el orden del reparto
+    familias = list(reparto)
+    fracciones = np.array([reparto[familia] for familia in familias])
+    monto = asignacion['Valor/mon.inf.'].to_numpy() * asignacion['Proporción'].to_numpy()
+    filas_nuevas_df = pd.DataFrame({
+        'Ejercicio': np.repeat(asignacion['Ejercicio'].to_numpy(), len(familias)),
+        'Período': np.repeat(asignacion['Período'].to_numpy(), len(familias)),
+        'Proceso': np.repeat(asignacion['Proceso'].to_numpy(), len(familias)),
+        'Valor/mon.inf.': (monto[:, None] * fracciones[None, :]).ravel(),
+        'Familia_Cuenta': np.tile(familias, len(asignacion)),
+    })
+
+    # Paso 6 y 7: Agregar las nuevas filas y eliminar las filas correspondientes a "Overhead"
+    data0 = pd.concat([data0[~es_overhead], filas_nuevas_df], ignore_index=True)
+    return data0
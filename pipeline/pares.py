@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+
+CLAVES_PARES = ['Clase de coste', 'Centro de coste']
+
+
+# Función para identificar y eliminar pares de valores opuestos (versión vectorizada)
+#
+# Reproduce exactamente la lógica de `eliminar_pares_opuestos_iterativo`, pero sin iterar filas:
+# - Dentro de cada grupo (Clase de coste, Centro de coste) solo interactúan filas con el mismo
+#   monto absoluto, así que se trabaja por partición (grupo, |valor|).
+# - En un mismo período, un negativo se anula con el positivo inmediatamente anterior.
+#   El último positivo del período que no se anuló queda disponible para períodos posteriores;
+#   los demás quedan "pisados" en el diccionario original y nunca se eliminan.
+# - Entre períodos, los negativos sin pareja toman el positivo disponible más reciente (una pila),
+#   lo que se resuelve con la profundidad acumulada de la pila y un ordenamiento por nivel.
+def eliminar_pares_opuestos(data):
+    orden, eliminadas, _ = emparejar_opuestos(data)
+    eliminadas_orden = eliminadas[orden]
+    filtered_df = data.iloc[orden[~eliminadas_orden]]
+    removed_df = data.iloc[orden[eliminadas_orden]]
+    return filtered_df, removed_df
+
+
+# Núcleo del emparejamiento. Devuelve, por posición:
+# - `orden`: orden de procesamiento de las filas con grupo válido
+# - `eliminadas`: filas que forman parte de un par opuesto
+# - `pendientes`: positivos que quedan disponibles para anular reversas de períodos posteriores
+#   (el estado que se persiste en la ingesta incremental)
+def emparejar_opuestos(data):
+    n = len(data)
+    grupo = data.groupby(CLAVES_PARES, sort=True).ngroup().to_numpy(dtype='float64')
+    periodo = pd.to_numeric(data['Período'], errors='coerce').to_numpy(dtype='float64')
+    valor = pd.to_numeric(data['Valor/mon.inf.'], errors='coerce').to_numpy(dtype='float64')
+    posicion = np.arange(n)
+
+    # Orden de procesamiento: grupo, período y orden original (las filas sin grupo se descartan, como en groupby)
+    validas = ~np.isnan(grupo)
+    orden = posicion[validas][np.lexsort((posicion[validas], periodo[validas], grupo[validas]))]
+
+    eliminadas = np.zeros(n, dtype=bool)
+    pendientes = np.zeros(n, dtype=bool)
+    candidatas = validas & ~np.isnan(periodo) & ~np.isnan(valor) & (valor != 0)
+    if candidatas.any():
+        idx = posicion[candidatas]
+        monto = pd.factorize(np.abs(valor[idx]))[0]
+        orden_particion = np.lexsort((idx, periodo[idx], monto, grupo[idx]))
+        idx, m = idx[orden_particion], monto[orden_particion]
+        g, p = grupo[idx], periodo[idx]
+        negativo = valor[idx] < 0
+
+        # Límites de partición (grupo, monto) y de bloque (grupo, monto, período)
+        nueva_particion = np.ones(len(idx), dtype=bool)
+        nueva_particion[1:] = (g[1:] != g[:-1]) | (m[1:] != m[:-1])
+        nuevo_bloque = nueva_particion.copy()
+        nuevo_bloque[1:] |= p[1:] != p[:-1]
+        ultimo_del_bloque = np.ones(len(idx), dtype=bool)
+        ultimo_del_bloque[:-1] = nuevo_bloque[1:]
+
+        # Pares dentro del mismo período: negativo precedido directamente por un positivo del bloque
+        par_local = np.zeros(len(idx), dtype=bool)
+        par_local[1:] = negativo[1:] & ~negativo[:-1] & ~nuevo_bloque[1:]
+        eliminadas[idx[par_local]] = True
+        eliminadas[idx[np.flatnonzero(par_local) - 1]] = True
+        emparejado_local = par_local.copy()
+        emparejado_local[:-1] |= par_local[1:]
+
+        # Eventos de pila: el último positivo libre del bloque se apila y los negativos libres desapilan
+        apila = ~negativo & ~emparejado_local & ultimo_del_bloque & (p >= 1)
+        desapila = negativo & ~par_local
+        eventos = np.flatnonzero(apila | desapila)
+        if len(eventos):
+            paso = np.where(apila[eventos], 1, -1)
+            particion = np.cumsum(nueva_particion)[eventos]
+            inicio = np.ones(len(eventos), dtype=bool)
+            inicio[1:] = particion[1:] != particion[:-1]
+
+            # Profundidad de la pila acotada en cero (los negativos sin positivo disponible se conservan)
+            acumulado = np.cumsum(paso)
+            base = np.maximum.accumulate(np.where(inicio, np.arange(len(eventos)), 0))
+            acumulado = acumulado - acumulado[base] + paso[base]
+            minimo = pd.Series(acumulado).groupby(particion).cummin().to_numpy()
+            profundidad = acumulado - np.minimum(minimo, 0)
+            profundidad_previa = np.empty_like(profundidad)
+            profundidad_previa[0] = 0
+            profundidad_previa[1:] = profundidad[:-1]
+            profundidad_previa[inicio] = 0
+
+            # Cada negativo efectivo se anula con el último positivo apilado en su mismo nivel
+            efectivo = (paso == 1) | (profundidad_previa > 0)
+            nivel = np.where(paso == 1, profundidad, profundidad_previa)
+            sel = np.flatnonzero(efectivo)
+            sel = sel[np.lexsort((sel, nivel[sel], particion[sel]))]
+            es_pop = paso[sel] == -1
+            pops = np.flatnonzero(es_pop)
+            eliminadas[idx[eventos[sel[pops]]]] = True
+            eliminadas[idx[eventos[sel[pops - 1]]]] = True
+
+            # Los positivos apilados que ningún negativo alcanzó siguen disponibles
+            pendientes[idx[eventos[apila[eventos]]]] = True
+            pendientes &= ~eliminadas
+
+    return orden, eliminadas, pendientes
+
+
+# Implementación original fila a fila; se conserva como referencia para verificar la paridad de la versión vectorizada.
+# El orden dentro de cada período usa un sort estable: con el quicksort por defecto, el orden entre filas del mismo
+# período (y por lo tanto qué filas se anulan) dependía de la plataforma.
+def eliminar_pares_opuestos_iterativo(data):
+    filtered_df = pd.DataFrame()
+    removed_df = pd.DataFrame()
+    groups = data.groupby(CLAVES_PARES)
+
+    for name, group in groups:
+        seen_values = {}
+        rows_to_remove = set()
+
+        # Ordenar el grupo por 'Período' de forma ascendente para procesar en orden temporal
+        group = group.sort_values(by='Período', kind='stable')
+
+        for index, row in group.iterrows():
+            value = row['Valor/mon.inf.']
+            period = row['Período']
+
+            if value < 0:
+                # Buscar coincidencia en el mismo período
+                if (period, -value) in seen_values:
+                    opposite_index = seen_values[(period, -value)]
+                    rows_to_remove.add(index)
+                    rows_to_remove.add(opposite_index)
+                    del seen_values[(period, -value)]
+                else:
+                    # Buscar coincidencia en períodos anteriores
+                    for past_period in range(period - 1, 0, -1):
+                        if (past_period, -value) in seen_values:
+                            opposite_index = seen_values[(past_period, -value)]
+                            rows_to_remove.add(index)
+                            rows_to_remove.add(opposite_index)
+                            del seen_values[(past_period, -value)]
+                            break
+                    else:
+                        # No se encontró coincidencia, mantener el valor negativo
+                        seen_values[(period, value)] = index
+            else:
+                seen_values[(period, value)] = index
+
+        # Convertir el set a una lista para indexar
+        rows_to_remove_list = list(rows_to_remove)
+
+        # Eliminar las filas identificadas y almacenar en removed_df
+        group_filtered = group.drop(rows_to_remove_list)
+        removed_rows = group.loc[rows_to_remove_list]
+        removed_df = pd.concat([removed_df, removed_rows])
+        filtered_df = pd.concat([filtered_df, group_filtered])
+
+    return filtered_df, removed_df
@@ -0,0 +1,285 @@
+"""Almacenamiento del gasto y el presupuesto particionado por año, con carga perezosa de los años seleccionados.
+
+Con BUDGET_MONITOR_PARTICIONADO=1 el pipeline completo corre una sola vez por versión de los datos y su resultado
+se guarda en `.particiones/<versión>/` (o en BUDGET_MONITOR_DIR_PARTICIONES), un archivo Arrow por año y tabla:
+- gasto_<año>: gasto enriquecido del año, con la posición de cada fila en el gasto completo ('fila')
+- celdas_<año>: celdas de gasto del cubo
+- presupuesto_<año>: filas de presupuesto del año, más presupuesto_overhead con el Overhead de todos los años
+  (las consultas lo suman completo cuando todos los procesos están seleccionados)
+y un `manifiesto.json` con los años, los procesos y las particiones. Las páginas leen solo las particiones de los
+años seleccionados; las menos usadas se desalojan al pasar de BUDGET_MONITOR_PARTICIONES_MB.
+La primera construcción de cada versión sigue enriqueciendo toda la historia (la eliminación de pares empareja
+filas de distintos años); lo que deja de depender de la historia son las cargas con la versión ya en disco.
+"""
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from pipeline.cubo import DIMENSIONES_CUBO_PRESUPUESTO, CuboGasto
+from pipeline.descargas import validadores
+from pipeline.diagnostico import etapa
+from pipeline.resultados import CacheResultados
+from pipeline.snapshots import huella
+
+# Directorio de las particiones de cada versión de los datos
+DIRECTORIO_PARTICIONES = Path(os.environ.get('BUDGET_MONITOR_DIR_PARTICIONES', Path(__file__).resolve().parent.parent / '.particiones'))
+
+# Tope de memoria de las particiones cargadas y de las consultas preparadas para cada selección de años
+# (BUDGET_MONITOR_PARTICIONES_MB, 512 MB por defecto)
+MAX_MB_PARTICIONES = float(os.environ.get('BUDGET_MONITOR_PARTICIONES_MB', 512))
+
+# Cambia si cambia el formato de las particiones o el pipeline que las produce
+VERSION_PARTICIONES = 1
+
+
+# Activar el almacenamiento particionado desde el entorno (BUDGET_MONITOR_PARTICIONADO=1)
+def modo_particionado():
+    return os.environ.get('BUDGET_MONITOR_PARTICIONADO', '').lower() in ('1', 'true', 'si', 'sí')
+
+
+# Versión de las fuentes: las URLs (que incluyen el mes del extracto) y su contenido actual, sin leerlo:
+# tamaño y fecha de los archivos locales, ETag y Last-Modified de las URLs (o el hash del cuerpo, si el servidor
+# rechaza HEAD)
+def version_fuentes(urls, reparto_overhead=None):
+    partes = [VERSION_PARTICIONES, repr(reparto_overhead)]
+    for url in urls:
+        ruta = Path(str(url))
+        if '://' in str(url):
+            actuales = validadores(str(url))
+            partes.append(f"{url}:{actuales.get('etag')}:{actuales.get('last_modified')}")
+            if actuales.get('contenido'):
+                partes.append(actuales['contenido'])
+        elif ruta.exists():
+            estado = ruta.stat()
+            partes.append(f'{url}:{estado.st_size}:{estado.st_mtime_ns}')
+        else:
+            partes.append(str(url))
+    return huella('|'.join(str(parte) for parte in partes).encode())
+
+
+def directorio_particiones(urls, reparto_overhead=None, directorio=None):
+    return Path(directorio or DIRECTORIO_PARTICIONES) / version_fuentes(urls, reparto_overhead)
+
+
+# Nombre de partición de un año (los años faltantes quedan en 'nulo')
+def nombre_particion(año):
+    return 'nulo' if pd.isna(año) else str(int(año))
+
+
+# Valores de una lista como JSON (NaN como null, enteros de numpy como int)
+def a_json(valores):
+    return [None if pd.isna(valor) else valor.item() if isinstance(valor, np.generic) else valor for valor in valores]
+
+
+def desde_json(valores):
+    return [np.nan if valor is None else valor for valor in valores]
+
+
+# Concatenar partes uniendo antes las categorías, para no perder las columnas categóricas
+def _concatenar(partes):
+    partes = [parte.copy() for parte in partes]
+    for columna in partes[0].columns:
+        if not all(isinstance(parte[columna].dtype, pd.CategoricalDtype) for parte in partes):
+            continue
+        categorias = partes[0][columna].cat.categories
+        for parte in partes[1:]:
+            categorias = categorias.union(parte[columna].cat.categories)
+        for parte in partes:
+            parte[columna] = parte[columna].cat.set_categories(categorias)
+    return pd.concat(partes, ignore_index=True)
+
+
+def _por_año(data, columna):
+    return {nombre_particion(año): parte for año, parte in data.groupby(columna, dropna=False, sort=True, observed=True)}
+
+
+def escribir_particiones(datos, directorio):
+    """Guarda el gasto, las celdas del cubo y el presupuesto de `datos` (un DatosMonitor) particionados por año.
+
+    Se escribe en un directorio temporal que se renombra al final, así que nunca se lee una versión a medias.
+    """
+    directorio = Path(directorio)
+    temporal = directorio.with_name(f'{directorio.name}.{os.getpid()}.tmp')
+    shutil.rmtree(temporal, ignore_errors=True)
+    temporal.mkdir(parents=True)
+
+    data0 = datos.data0.assign(fila=np.arange(len(datos.data0)))
+    budget_data = datos.budget_data
+    tablas = {
+        'gasto': _por_año(data0, 'Ejercicio'),
+        'celdas': _por_año(datos.cubo.gasto, 'Ejercicio'),
+        'presupuesto': _por_año(budget_data, 'Año'),
+    }
+    for tabla, partes in tablas.items():
+        for nombre, parte in partes.items():
+            feather.write_feather(parte.reset_index(drop=True), temporal / f'{tabla}_{nombre}.arrow', compression='uncompressed')
+    overhead = budget_data[budget_data['Proceso'] == 'Overhead'].reset_index(drop=True)
+    feather.write_feather(overhead, temporal / 'presupuesto_overhead.arrow', compression='uncompressed')
+
+    manifiesto = {
+        'años': a_json(datos.cubo.años),
+        'procesos': a_json(datos.cubo.procesos),
+        'particiones': {tabla: list(partes) for tabla, partes in tablas.items()},
+        'filas': len(data0),
+    }
+    (temporal / 'manifiesto.json').write_text(json.dumps(manifiesto, indent=2, ensure_ascii=False), encoding='utf-8')
+
+    # Otro proceso pudo publicar la misma versión mientras tanto: se conserva la primera
+    try:
+        os.replace(temporal, directorio)
+    except OSError:
+        shutil.rmtree(temporal, ignore_errors=True)
+
+
+class _Seleccion(NamedTuple):
+    """Consultas preparadas para una selección de años y la memoria de las tablas que se crearon para ellas."""
+    consultas: Any
+    bytes: int
+
+
+# Memoria de una entrada de la caché del almacén: una partición o las consultas de una selección de años
+def _memoria(valor):
+    if isinstance(valor, _Seleccion):
+        return valor.bytes
+    return int(valor.memory_usage(deep=True).sum())
+
+
+class _AlmacenMedido:
+    """Vista de un almacén que suma la memoria (`_memoria`) de las tablas que entrega, de las que copian o derivan
+    las consultas de una selección."""
+
+    def __init__(self, almacen):
+        self.almacen = almacen
+        self.bytes = 0
+
+    def gasto(self, years):
+        gasto = self.almacen.gasto(years)
+        self.bytes += _memoria(gasto)
+        return gasto
+
+    def presupuesto(self, years):
+        presupuesto = self.almacen.presupuesto(years)
+        self.bytes += _memoria(presupuesto)
+        return presupuesto
+
+    def cubo(self, years):
+        cubo = self.almacen.cubo(years)
+        self.bytes += _memoria(cubo.gasto) + _memoria(cubo.presupuesto)
+        return cubo
+
+
+class AlmacenParticiones:
+    """Particiones de una versión de los datos: se leen del disco solo al pedir sus años.
+
+    Las particiones leídas quedan en una caché LRU con tope de memoria, compartida por todas las sesiones.
+    """
+
+    def __init__(self, directorio, max_bytes=None):
+        self.directorio = Path(directorio)
+        manifiesto = json.loads((self.directorio / 'manifiesto.json').read_text(encoding='utf-8'))
+        self.años = desde_json(manifiesto['años'])
+        self.procesos = desde_json(manifiesto['procesos'])
+        self.particiones = manifiesto['particiones']
+        self.cache = CacheResultados(MAX_MB_PARTICIONES * 2**20 if max_bytes is None else max_bytes, medir=_memoria)
+
+    def _leer(self, nombre):
+        with etapa(f'particion {nombre}') as registro:
+            data, acierto = self.cache.obtener(nombre, lambda: feather.read_feather(self.directorio / f'{nombre}.arrow'))
+            registro['filas_salida'] = len(data)
+            if acierto:
+                registro['etapa'] = f'particion {nombre} (caché)'
+        return data
+
+    # Particiones de una tabla para los años pedidos, en el orden de los años (como en la tabla completa)
+    def _partes(self, tabla, years):
+        nombres = {nombre_particion(año) for año in years}
+        return [self._leer(f'{tabla}_{nombre}') for nombre in self.particiones[tabla] if nombre in nombres]
+
+    def gasto(self, years):
+        """Gasto enriquecido de los años, en el orden del gasto completo."""
+        partes = self._partes('gasto', years)
+        if not partes:
+            return self._leer(f"gasto_{self.particiones['gasto'][0]}").iloc[:0].drop(columns='fila')
+        gasto = _concatenar(partes)
+        return gasto.sort_values('fila', kind='stable', ignore_index=True).drop(columns='fila')
+
+    def presupuesto(self, years):
+        """Presupuesto de los años más el Overhead de todos los años, en el orden del presupuesto por año."""
+        nombres = {nombre_particion(año) for año in years}
+        overhead = self._leer('presupuesto_overhead')
+        partes = []
+        for nombre in self.particiones['presupuesto']:
+            if nombre in nombres:
+                partes.append(self._leer(f'presupuesto_{nombre}'))
+            else:
+                partes.append(overhead[overhead['Año'].map(nombre_particion) == nombre])
+        return _concatenar(partes)
+
+    def cubo(self, years):
+        """Cubo de los años seleccionados, con los años y procesos de todos los datos."""
+        partes = self._partes('celdas', years)
+        gasto = _concatenar(partes) if partes else self._leer(f"celdas_{self.particiones['celdas'][0]}").iloc[:0]
+        presupuesto = self.presupuesto(years).groupby(
+            DIMENSIONES_CUBO_PRESUPUESTO, observed=True, dropna=False,
+        )['Presupuesto'].sum().reset_index()
+        return CuboGasto(gasto, presupuesto, self.años, self.procesos)
+
+
+class ConsultasParticionadas:
+    """Consultas de una página sobre las particiones de los años seleccionados (misma interfaz que ConsultasSQL).
+
+    `crear(almacen, years)` prepara las consultas del motor para unos años. Se conservan en la caché del almacén,
+    medidas por las tablas que se crearon para ellas y dentro del mismo tope de memoria que las particiones: cambiar
+    procesos o familias no vuelve a leer particiones, y cuando falta memoria se desaloja lo usado hace más tiempo
+    (particiones o selecciones). Una selección que por sí sola supera el tope no se conserva.
+    """
+
+    def __init__(self, almacen, crear):
+        self.almacen = almacen
+        self.años = almacen.años
+        self.procesos = almacen.procesos
+        self._crear = crear
+
+    def _crear_seleccion(self, years):
+        medido = _AlmacenMedido(self.almacen)
+        consultas = self._crear(medido, years)
+        return _Seleccion(consultas, medido.bytes)
+
+    def _consultas(self, years):
+        # Las particiones se guardan con su nombre; las selecciones, con las consultas que las crean (el almacén es
+        # común a las páginas y motores) y los nombres de sus particiones
+        clave = ('seleccion', self._crear, *sorted({nombre_particion(año) for año in years}))
+        return self.almacen.cache.obtener(clave, lambda: self._crear_seleccion(years))[0].consultas
+
+    def gasto_por_proceso(self, years, procesos, familias, familia):
+        return self._consultas(years).gasto_por_proceso(years, procesos, familias, familia)
+
+    def gasto_real_mensual(self, years, procesos, familias):
+        return self._consultas(years).gasto_real_mensual(years, procesos, familias)
+
+    def presupuesto_mensual(self, years, procesos, familias):
+        return self._consultas(years).presupuesto_mensual(years, procesos, familias)
+
+    def presupuesto_total(self, years, procesos, familias):
+        return self._consultas(years).presupuesto_total(years, procesos, familias)
+
+    def metricas_tipo_orden(self, years, procesos, familias):
+        return self._consultas(years).metricas_tipo_orden(years, procesos, familias)
+
+    def gasto_mensual_tipo_orden(self, years, procesos, familias):
+        return self._consultas(years).gasto_mensual_tipo_orden(years, procesos, familias)
+
+    def top_gastos(self, years, procesos, familias, ultimo_mes=False, n=5):
+        return self._consultas(years).top_gastos(years, procesos, familias, ultimo_mes, n)
+
+    def mayores_gastos(self, years, procesos, familias, n=5, agrupacion='Ninguna', ultimo_mes=False):
+        return self._consultas(years).mayores_gastos(years, procesos, familias, n, agrupacion, ultimo_mes)
+
+    def gasto_con_ot(self, years, procesos, familias):
+        return self._consultas(years).gasto_con_ot(years, procesos, familias)
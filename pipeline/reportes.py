@@ -0,0 +1,148 @@
+"""Generador de reportes estáticos de las páginas de Gasto y Órdenes, sin Streamlit.
+
+Uso:
+    python -m pipeline.reportes --salida reportes
+    python -m pipeline.reportes --salida reportes --años 2024 --procesos todos Producción --familias todas
+
+Calcula los indicadores, tablas y gráficos de ambas páginas para cada combinación de año, proceso y
+familia de cuenta (un valor o `todos`/`todas`) en un pool de procesos. Deja por combinación
+`<salida>/<combinación>/<página>/` con `indicadores.json`, las tablas en CSV y los gráficos como JSON
+de Plotly, más un `indice.json` con los filtros y el estado de cada combinación.
+"""
+import argparse
+import itertools
+import json
+import re
+import time
+import traceback
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from pipeline.cubo import ConsultasCubo
+from pipeline.datos import FUENTES_PAGINAS, construir_datos
+from pipeline.fuentes import ubicaciones
+from pipeline.ordenes import ConsultasOrdenes
+from pipeline.sql import ConsultasSQL, motor_consultas
+from pipeline.vistas import REPORTES
+
+# Valor de un filtro que selecciona todas las opciones (como el valor por defecto de la barra lateral)
+TODOS = 'todos'
+FAMILIAS = ['Materiales', 'Servicios']
+
+# Consultas de cada proceso del pool (se crean una vez por proceso en `_iniciar`)
+_consultas = {}
+
+
+# Nombre de directorio de una combinación: sin tildes, espacios ni separadores
+def nombre_combinacion(año, proceso, familia):
+    texto = '_'.join(str(valor) for valor in (año, proceso, familia))
+    texto = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^A-Za-z0-9_-]+', '-', texto)
+
+
+def combinaciones(años, procesos, familias):
+    """Combinaciones (año, proceso, familia) a generar; `todos` y `todas` seleccionan todas las opciones."""
+    return list(itertools.product(años, procesos, familias))
+
+
+# Indicador como valor JSON (NaN e infinitos, p. ej. sin meses con gasto, quedan como null)
+def _indicador(valor):
+    valor = valor.item() if isinstance(valor, np.generic) else valor
+    if valor is None or (isinstance(valor, float) and not np.isfinite(valor)):
+        return None
+    return valor
+
+
+def escribir_reporte(reporte, directorio):
+    """Escribe indicadores.json, las tablas en CSV y las figuras como JSON de Plotly."""
+    directorio = Path(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    indicadores = {nombre: _indicador(valor) for nombre, valor in reporte['indicadores'].items()}
+    (directorio / 'indicadores.json').write_text(json.dumps(indicadores, indent=2, ensure_ascii=False), encoding='utf-8')
+    for nombre, tabla in reporte['tablas'].items():
+        tabla.to_csv(directorio / f'{nombre}.csv', index=not isinstance(tabla.index, pd.RangeIndex), encoding='utf-8')
+    for nombre, figura in reporte['figuras'].items():
+        (directorio / f'{nombre}.json').write_text(figura.to_json(), encoding='utf-8')
+
+
+def _iniciar(datos, motor):
+    if motor == 'duckdb':
+        _consultas['gasto'], _consultas['ordenes'] = ConsultasSQL(datos['gasto']), ConsultasSQL(datos['ordenes'])
+    else:
+        _consultas['gasto'], _consultas['ordenes'] = ConsultasCubo(datos['gasto'].cubo), ConsultasOrdenes(datos['ordenes'])
+
+
+# Tarea del pool: una combinación, ambas páginas; los errores quedan en el índice en vez de detener el lote
+def _generar(combinacion, salida):
+    año, proceso, familia = combinacion
+    familias = FAMILIAS if familia == 'todas' else [familia]
+
+    nombre = nombre_combinacion(año, proceso, familia)
+    resultado = {'combinacion': nombre, 'año': año, 'proceso': proceso, 'familia': familia, 'paginas': {}}
+    for pagina, reporte in REPORTES.items():
+        # 'todos' son las opciones de la barra lateral de cada página, que usa su propio extracto
+        consultas = _consultas[pagina]
+        years = consultas.años if año == TODOS else [año]
+        procesos = consultas.procesos if proceso == TODOS else [proceso]
+        inicio = time.perf_counter()
+        try:
+            escribir_reporte(reporte(consultas, years, procesos, familias), Path(salida) / nombre / pagina)
+            resultado['paginas'][pagina] = {'estado': 'ok'}
+        except Exception as error:
+            resultado['paginas'][pagina] = {'estado': 'error', 'error': f'{type(error).__name__}: {error}', 'detalle': traceback.format_exc()}
+        resultado['paginas'][pagina]['segundos'] = time.perf_counter() - inicio
+    return resultado
+
+
+def generar_reportes(datos, salida, años=None, procesos=None, familias=None, procesos_pool=None, motor=None):
+    """Genera los reportes de todas las combinaciones en `salida` y devuelve el índice.
+
+    `datos` tiene el DatosMonitor de cada página ('gasto' y 'ordenes'). Por omisión se generan cada año y
+    cada proceso por separado y todos juntos, y cada familia de cuenta y ambas.
+    """
+    motor = motor_consultas() if motor is None else motor
+    opciones = ConsultasCubo(datos['gasto'].cubo)
+    años = [TODOS] + sorted(opciones.años) if años is None else años
+    procesos = [TODOS] + [proceso for proceso in opciones.procesos if isinstance(proceso, str)] if procesos is None else procesos
+    familias = ['todas'] + FAMILIAS if familias is None else familias
+    lista = combinaciones(años, procesos, familias)
+
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=procesos_pool, initializer=_iniciar, initargs=(datos, motor)) as pool:
+        resultados = list(pool.map(_generar, lista, itertools.repeat(salida)))
+
+    indice = {
+        'generado': datetime.now().isoformat(timespec='seconds'),
+        'motor': motor,
+        'segundos': time.perf_counter() - inicio,
+        'combinaciones': resultados,
+    }
+    Path(salida).mkdir(parents=True, exist_ok=True)
+    (Path(salida) / 'indice.json').write_text(json.dumps(indice, indent=2, ensure_ascii=False, default=str), encoding='utf-8')
+    return indice
+
+
+def _año(valor):
+    return valor if valor == TODOS else int(valor)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--salida', default='reportes')
+    parser.add_argument('--años', nargs='+', type=_año, help="años a generar (o 'todos'); por omisión cada año y todos")
+    parser.add_argument('--procesos', nargs='+', help="procesos a generar (o 'todos'); por omisión cada proceso y todos")
+    parser.add_argument('--familias', nargs='+', choices=FAMILIAS + ['todas'], help="familias a generar (o 'todas')")
+    parser.add_argument('--procesos-pool', type=int, help="procesos del pool (por omisión, uno por CPU)")
+    argumentos = parser.parse_args()
+
+    datos = {pagina: construir_datos(*ubicaciones(extracto)) for pagina, extracto in FUENTES_PAGINAS.items()}
+    indice = generar_reportes(datos, argumentos.salida, argumentos.años, argumentos.procesos, argumentos.familias, argumentos.procesos_pool)
+    errores = [c['combinacion'] for c in indice['combinaciones'] if any(p['estado'] != 'ok' for p in c['paginas'].values())]
+    print(f"{len(indice['combinaciones'])} combinaciones en {indice['segundos']:.1f} s, {len(errores)} con errores -> {argumentos.salida}")
+    for nombre in errores:
+        print(f"    error: {nombre}")
@@ -0,0 +1,114 @@
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from pipeline.diagnostico import etapa
+from pipeline.vistas import REPORTES, SECCIONES
+
+# Tope de memoria de los resultados de página cacheados (BUDGET_MONITOR_CACHE_MB, 256 MB por defecto)
+MAX_MB_RESULTADOS = float(os.environ.get('BUDGET_MONITOR_CACHE_MB', 256))
+
+
+# Tamaño aproximado de un resultado: el de su serialización (tablas, indicadores y figuras)
+def _tamaño(valor):
+    return len(pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class CacheResultados:
+    """Caché LRU compartida por todas las sesiones del proceso, con tope de memoria en bytes.
+
+    `medir` da el tamaño de cada valor (por omisión, el de su serialización). Si varias sesiones piden a la vez
+    la misma clave, solo la primera la calcula y las demás esperan su resultado. Los valores se comparten sin
+    copiar, así que quien los recibe no debe modificarlos.
+    """
+
+    def __init__(self, max_bytes, medir=_tamaño):
+        self.max_bytes = max_bytes
+        self.medir = medir
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self._entradas = OrderedDict()
+        self._candado = threading.Lock()
+        self._en_curso = {}
+
+    def obtener(self, clave, calcular):
+        """Valor de la clave (calculado con `calcular()` si no está) y si vino de la caché."""
+        with self._candado:
+            if clave in self._entradas:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return self._entradas[clave][0], True
+            candado_clave = self._en_curso.setdefault(clave, threading.Lock())
+
+        with candado_clave:
+            # Otra sesión pudo calcularla mientras se esperaba el candado de la clave
+            with self._candado:
+                if clave in self._entradas:
+                    self._entradas.move_to_end(clave)
+                    self.aciertos += 1
+                    return self._entradas[clave][0], True
+                self.fallos += 1
+            try:
+                valor = calcular()
+                self._guardar(clave, valor, self.medir(valor))
+            finally:
+                with self._candado:
+                    self._en_curso.pop(clave, None)
+        return valor, False
+
+    def _guardar(self, clave, valor, tamaño):
+        if tamaño > self.max_bytes:
+            return
+        with self._candado:
+            self._entradas[clave] = (valor, tamaño)
+            self.bytes += tamaño
+            # Desalojar las entradas usadas hace más tiempo hasta volver bajo el tope
+            while self.bytes > self.max_bytes:
+                _, (_, liberado) = self._entradas.popitem(last=False)
+                self.bytes -= liberado
+
+    def estadisticas(self):
+        with self._candado:
+            return {
+                'entradas': len(self._entradas),
+                'mb': self.bytes / 2**20,
+                'max_mb': self.max_bytes / 2**20,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+            }
+
+    def limpiar(self):
+        with self._candado:
+            self._entradas.clear()
+            self.bytes = 0
+
+
+RESULTADOS = CacheResultados(MAX_MB_RESULTADOS * 2**20)
+
+
+# Filtros normalizados: sin duplicados, sin importar el orden de selección y con NaN como None
+def normalizar_filtros(years, procesos, familias):
+    return tuple(
+        tuple(sorted({None if pd.isna(valor) else valor for valor in valores}, key=str))
+        for valores in (years, procesos, familias)
+    )
+
+
+def resultado_pagina(pagina, version, consultas, years, procesos, familias, seccion=None):
+    """Indicadores, tablas y figuras de una página ('gasto' u 'ordenes'), o de una de sus secciones, calculados
+    una vez por versión y filtros.
+
+    `version` identifica los datos (p. ej. el motor y las URLs, que incluyen la versión de cada archivo).
+    """
+    calcular = REPORTES[pagina] if seccion is None else SECCIONES[pagina][seccion]
+    nombre = pagina if seccion is None else f'{pagina}/{seccion}'
+    clave = (nombre, version, normalizar_filtros(years, procesos, familias))
+    with etapa(f'resultado {nombre}') as registro:
+        resultado, acierto = RESULTADOS.obtener(clave, lambda: calcular(consultas, years, procesos, familias))
+        if acierto:
+            registro['etapa'] = f'resultado {nombre} (caché)'
+    return resultado
@@ -0,0 +1,82 @@
+import hashlib
+import os
+import re
+import threading
+from pathlib import Path
+from urllib.parse import urlparse
+
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# Directorio local donde se guardan las versiones columnar (Arrow IPC) de cada fuente
+DIRECTORIO_SNAPSHOTS = Path(os.environ.get('BUDGET_MONITOR_SNAPSHOTS', Path(__file__).resolve().parent.parent / '.snapshots'))
+
+# Snapshots que se conservan por fuente (el contenido vigente y el anterior, que otro proceso puede seguir usando)
+SNAPSHOTS_CONSERVADOS = 2
+
+
+def huella(contenido: bytes) -> str:
+    """Devuelve el hash del contenido de una fuente, usado como clave del snapshot."""
+    return hashlib.sha256(contenido).hexdigest()[:20]
+
+
+# Nombre de una fuente sin el mes del extracto (Data_0824 y Data_0924 son la misma fuente)
+def nombre_fuente(url) -> str:
+    return re.sub(r'_\d{4}(?=_|$)', '', Path(urlparse(str(url)).path).stem)
+
+
+def ruta_snapshot(clave: str, directorio: Path = None) -> Path:
+    """Ruta del snapshot Arrow para una clave de contenido."""
+    return Path(directorio or DIRECTORIO_SNAPSHOTS) / f"{clave}.arrow"
+
+
+def leer_snapshot(clave: str, directorio: Path = None):
+    """Abre el snapshot con memory-map; devuelve None si no existe."""
+    ruta = ruta_snapshot(clave, directorio)
+    if not ruta.exists():
+        return None
+    # Sin compresión y por columna (sin consolidar bloques), las columnas numéricas y de texto son vistas del mapa
+    # de memoria: sus páginas se cargan al leerlas y el sistema operativo las puede liberar
+    tabla = pa.ipc.open_file(pa.memory_map(str(ruta), 'r')).read_all()
+    return tabla.to_pandas(split_blocks=True)
+
+
+def escribir_snapshot(data, clave: str, directorio: Path = None) -> bool:
+    """Guarda el DataFrame como Arrow IPC sin compresión. Devuelve False si las columnas no se pueden tipar."""
+    ruta = ruta_snapshot(clave, directorio)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        feather.write_feather(data, temporal, compression='uncompressed')
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        # Columnas con tipos mezclados: se sigue leyendo desde el CSV
+        temporal.unlink(missing_ok=True)
+        return False
+    # Reemplazo atómico para que otro proceso nunca lea un archivo a medio escribir
+    os.replace(temporal, ruta)
+    return True
+
+
+# Borrar los snapshots más antiguos de una fuente (su subdirectorio); los procesos que aún los mapean conservan
+# sus páginas
+def limpiar_snapshots(directorio: Path, conservar: int = SNAPSHOTS_CONSERVADOS):
+    snapshots = sorted(Path(directorio).glob('*.arrow'), key=lambda ruta: ruta.stat().st_mtime_ns, reverse=True)
+    for ruta in snapshots[conservar:]:
+        ruta.unlink(missing_ok=True)
+
+
+def cargar_con_snapshot(contenido: bytes, parsear, directorio: Path = None, version: str = '', fuente: str = None):
+    """Devuelve el DataFrame desde el snapshot del contenido, o lo parsea con `parsear` y lo guarda.
+
+    `version` identifica al parser (p. ej. el esquema) para no reutilizar snapshots de otra forma de parseo.
+    Con `fuente` los snapshots se agrupan por fuente y de cada una se conservan solo los más recientes.
+    """
+    clave = f"{huella(contenido)}-{version}" if version else huella(contenido)
+    if fuente:
+        directorio = Path(directorio or DIRECTORIO_SNAPSHOTS) / fuente
+    data = leer_snapshot(clave, directorio)
+    if data is None:
+        data = parsear(contenido)
+        if escribir_snapshot(data, clave, directorio) and fuente:
+            limpiar_snapshots(directorio)
+    return data
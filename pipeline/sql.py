@@ -0,0 +1,181 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from pipeline.cubo import formatear_gasto_real, resumir_presupuesto, todos_los_procesos
+from pipeline.mayores import AGRUPACIONES, COLUMNAS_TOP_GASTOS, columnas_mayores
+
+try:
+    import duckdb
+except ImportError:  # DuckDB es opcional: sin él las páginas consultan siempre con pandas
+    duckdb = None
+
+# Motores de consulta de las páginas (BUDGET_MONITOR_MOTOR)
+MOTORES = ('pandas', 'duckdb')
+
+# Columnas del gasto enriquecido que usan las consultas de las páginas
+COLUMNAS_GASTO_SQL = [
+    'Ejercicio', 'Período', 'Proceso', 'Familia_Cuenta', 'Recinto', 'Centro de coste', 'Orden partner',
+    'Denominación del objeto', 'Grupo_Ceco', 'Fe.contabilización', 'Valor/mon.inf.', 'Clase de orden',
+]
+
+# Filtros de la barra lateral; `isin` de pandas también acepta NaN, por eso cada lista lleva su marca de nulos
+FILTRO_GASTO = (
+    '(list_contains($years, "Ejercicio") OR ("Ejercicio" IS NULL AND $years_nulo)) AND '
+    '(list_contains($procesos, "Proceso") OR ("Proceso" IS NULL AND $procesos_nulo)) AND '
+    'list_contains($familias, "Familia_Cuenta")'
+)
+
+# Gasto filtrado con el monto truncado a entero y el 'Mes' como entero (página de Órdenes; la clase de cada orden
+# ya viene resuelta del enriquecimiento)
+GASTO_ORDENES = f'''
+    WITH filtrado AS (
+        SELECT *, CAST("Período" AS BIGINT) AS "Mes", CAST(trunc("Valor/mon.inf.") AS BIGINT) AS valor
+        FROM gasto WHERE {FILTRO_GASTO}
+    )
+'''
+
+
+def motor_consultas():
+    """Motor de las consultas de las páginas: 'pandas' (por defecto) o 'duckdb'."""
+    motor = os.environ.get('BUDGET_MONITOR_MOTOR', 'pandas').lower()
+    if motor not in MOTORES:
+        raise ValueError(f"BUDGET_MONITOR_MOTOR debe ser uno de {', '.join(MOTORES)}: '{motor}'")
+    if motor == 'duckdb' and duckdb is None:
+        raise ValueError("BUDGET_MONITOR_MOTOR=duckdb requiere el paquete duckdb (pip install duckdb)")
+    return motor
+
+
+# Parámetros de una lista de filtro: valores sin NaN y si la lista incluía NaN
+def _parametros_lista(nombre, valores):
+    return {nombre: [valor for valor in valores if not pd.isna(valor)], f'{nombre}_nulo': any(pd.isna(valor) for valor in valores)}
+
+
+def _parametros(years, procesos, familias):
+    return {
+        **_parametros_lista('years', years),
+        **_parametros_lista('procesos', procesos),
+        'familias': [familia for familia in familias if not pd.isna(familia)],
+    }
+
+
+class ConsultasSQL:
+    """Consultas de ambas páginas como SQL sobre DuckDB, con los mismos resultados que las de pandas.
+
+    El gasto y el presupuesto se copian a tablas columnares de una base en memoria. Cada consulta
+    abre su propio cursor, así que un mismo objeto se puede compartir entre sesiones.
+    """
+
+    def __init__(self, datos):
+        if duckdb is None:
+            raise ValueError("El motor SQL requiere el paquete duckdb (pip install duckdb)")
+        data0 = datos.data0
+        # 'fila' conserva el orden del gasto para desempatar igual que el orden estable de pandas
+        gasto = data0[COLUMNAS_GASTO_SQL].assign(fila=np.arange(len(data0)))
+        self._conexion = duckdb.connect()
+        for nombre, tabla in (('gasto', gasto), ('presupuesto', datos.budget_data)):
+            self._conexion.register('_tabla', tabla)
+            self._conexion.execute(f'CREATE TABLE {nombre} AS SELECT * FROM _tabla')
+            self._conexion.unregister('_tabla')
+        self.años = data0['Ejercicio'].unique().tolist()
+        self.procesos = data0['Proceso'].unique().tolist()
+
+    def _consulta(self, sql, parametros):
+        return self._conexion.cursor().execute(sql, parametros).df()
+
+    # Página de Gasto
+
+    def gasto_por_proceso(self, years, procesos, familias, familia):
+        return self._consulta(f'''
+            SELECT "Proceso", fsum("Valor/mon.inf.") AS "Valor/mon.inf."
+            FROM gasto
+            WHERE {FILTRO_GASTO} AND "Familia_Cuenta" = $familia AND "Proceso" IS NOT NULL
+            GROUP BY "Proceso" ORDER BY "Proceso"
+        ''', {**_parametros(years, procesos, familias), 'familia': familia})
+
+    def gasto_real_mensual(self, years, procesos, familias):
+        return formatear_gasto_real(self._consulta(f'''
+            SELECT "Ejercicio", "Período", fsum("Valor/mon.inf.") AS "Valor/mon.inf."
+            FROM gasto WHERE {FILTRO_GASTO}
+            GROUP BY "Ejercicio", "Período" ORDER BY "Ejercicio", "Período"
+        ''', _parametros(years, procesos, familias)))
+
+    # Celdas de presupuesto filtradas en el orden del cubo; si todos los procesos están seleccionados se agrega
+    # el Overhead de todos los años
+    def _presupuesto_filtrado(self, years, procesos, familias):
+        overhead = '' if not todos_los_procesos(procesos, self.procesos) else """
+            UNION ALL
+            SELECT "Año", "Mes", "Proceso", "Familia_Cuenta", fsum("Presupuesto") AS "Presupuesto", 1 AS parte
+            FROM presupuesto WHERE "Proceso" = 'Overhead'
+            GROUP BY "Año", "Mes", "Proceso", "Familia_Cuenta"
+        """
+        return self._consulta(f'''
+            SELECT "Año", "Mes", "Proceso", "Familia_Cuenta", fsum("Presupuesto") AS "Presupuesto", 0 AS parte
+            FROM presupuesto
+            WHERE (list_contains($years, "Año") OR ("Año" IS NULL AND $years_nulo))
+              AND (list_contains($procesos, "Proceso") OR ("Proceso" IS NULL AND $procesos_nulo))
+              AND list_contains($familias, "Familia_Cuenta")
+            GROUP BY "Año", "Mes", "Proceso", "Familia_Cuenta"
+            {overhead}
+            ORDER BY parte, "Año", "Mes", "Proceso" NULLS LAST, "Familia_Cuenta" NULLS LAST
+        ''', _parametros(years, procesos, familias))
+
+    def presupuesto_mensual(self, years, procesos, familias):
+        return resumir_presupuesto(self._presupuesto_filtrado(years, procesos, familias))
+
+    def presupuesto_total(self, years, procesos, familias):
+        return self._presupuesto_filtrado(years, procesos, familias)['Presupuesto'].sum()
+
+    # Página de Órdenes
+
+    def metricas_tipo_orden(self, years, procesos, familias):
+        return self._consulta(f'''{GASTO_ORDENES}
+            SELECT "Clase de orden", count("Orden partner") AS cantidad_ordenes, CAST(sum(valor) AS BIGINT) AS gasto
+            FROM filtrado WHERE "Clase de orden" IS NOT NULL
+            GROUP BY "Clase de orden" ORDER BY "Clase de orden"
+        ''', _parametros(years, procesos, familias))
+
+    def gasto_mensual_tipo_orden(self, years, procesos, familias):
+        return self._consulta(f'''{GASTO_ORDENES}
+            SELECT "Mes", "Clase de orden", CAST(sum(valor) AS BIGINT) AS "Valor/mon.inf."
+            FROM filtrado WHERE "Clase de orden" IS NOT NULL
+            GROUP BY "Mes", "Clase de orden" ORDER BY "Mes", "Clase de orden"
+        ''', _parametros(years, procesos, familias))
+
+    def top_gastos(self, years, procesos, familias, ultimo_mes=False, n=5):
+        columnas = ', '.join(f'"{columna}"' for columna in COLUMNAS_TOP_GASTOS[:-1])
+        mes = 'AND "Mes" = (SELECT max("Mes") FROM con_ceco)' if ultimo_mes else ''
+        return self._consulta(f'''{GASTO_ORDENES},
+            con_ceco AS (SELECT * FROM filtrado WHERE "Centro de coste" IS NOT NULL AND "Centro de coste" <> '')
+            SELECT {columnas}, valor AS "Valor/mon.inf."
+            FROM con_ceco WHERE TRUE {mes}
+            ORDER BY valor DESC, fila LIMIT {int(n)}
+        ''', _parametros(years, procesos, familias))
+
+    # Los N mayores de cada grupo con una ventana; sin agrupación es el Top de la página
+    def mayores_gastos(self, years, procesos, familias, n=5, agrupacion='Ninguna', ultimo_mes=False):
+        if not AGRUPACIONES[agrupacion]:
+            return self.top_gastos(years, procesos, familias, ultimo_mes, n)
+        grupos = ', '.join(f'"{columna}"' for columna in AGRUPACIONES[agrupacion])
+        orden_grupos = ', '.join(f'"{columna}" NULLS LAST' for columna in AGRUPACIONES[agrupacion])
+        columnas = ', '.join(f'"{columna}"' for columna in columnas_mayores(agrupacion)[:-1])
+        mes = 'AND "Mes" = (SELECT max("Mes") FROM con_ceco)' if ultimo_mes else ''
+        return self._consulta(f'''{GASTO_ORDENES},
+            con_ceco AS (SELECT * FROM filtrado WHERE "Centro de coste" IS NOT NULL AND "Centro de coste" <> ''),
+            ranking AS (
+                SELECT *, row_number() OVER (PARTITION BY {grupos} ORDER BY valor DESC, fila) AS puesto
+                FROM con_ceco WHERE TRUE {mes}
+            )
+            SELECT {columnas}, valor AS "Valor/mon.inf."
+            FROM ranking WHERE puesto <= {int(n)}
+            ORDER BY {orden_grupos}, puesto
+        ''', _parametros(years, procesos, familias))
+
+    def gasto_con_ot(self, years, procesos, familias):
+        totales = self._consulta(f'''{GASTO_ORDENES}
+            SELECT CAST(coalesce(sum(valor), 0) AS BIGINT) AS total,
+                   CAST(coalesce(sum(valor) FILTER (WHERE "Orden partner" IS NOT NULL), 0) AS BIGINT) AS con_ot
+            FROM filtrado
+        ''', _parametros(years, procesos, familias))
+        return totales['total'].iloc[0], totales['con_ot'].iloc[0]
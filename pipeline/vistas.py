@@ -0,0 +1,310 @@
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from pipeline.mayores import columnas_mayores
+
+# Presupuesto medio mensual de referencia, en millones de pesos
+PRESUPUESTO_MEDIO_MENSUAL = 767
+
+# Colores de cada tipo de OT en el gráfico de columnas apiladas
+COLORES_OT = {
+    'PM01': 'red',
+    'PM02': 'blue',
+    'PM03': 'lightblue',
+    'PM04': 'orange',
+    'PM05': 'pink',
+}
+
+MESES = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio', 'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
+
+
+# Página de Gasto
+
+# Gráfico de torta del gasto por proceso de una familia de cuenta
+def figura_torta(gasto, familia):
+    return px.pie(gasto, values='Valor/mon.inf.', names='Proceso', title=f'Distribución del Gasto en {familia}')
+
+
+# Gasto acumulado real y presupuestado hasta el último mes con gasto real (None si no hay presupuesto)
+def gasto_acumulado(gasto_real, gasto_presupuestado):
+    ultimo_mes_real = gasto_real['Mes'].max()
+    gasto_acumulado_real = gasto_real[gasto_real['Mes'] <= ultimo_mes_real]['Valor/mon.inf.'].sum()
+    if not gasto_presupuestado[gasto_presupuestado['Mes'] <= ultimo_mes_real].empty:
+        gasto_acumulado_presupuestado = gasto_presupuestado[gasto_presupuestado['Mes'] <= ultimo_mes_real]['Presupuesto'].sum()
+    else:
+        gasto_acumulado_presupuestado = None
+    return gasto_acumulado_real, gasto_acumulado_presupuestado
+
+
+# Gasto acumulado, presupuesto disponible, gasto medio de los meses con gasto real y proyección a fin de año
+def proyeccion_anual(gasto_real, presupuesto_anual_total):
+    gasto_acumulado_real = gasto_real['Valor/mon.inf.'].sum()
+    presupuesto_disponible = presupuesto_anual_total - gasto_acumulado_real
+    gasto_medio = gasto_acumulado_real / len(gasto_real)  # len(gasto_real) nos da el número de meses con gasto real
+    meses_restantes = 12 - len(gasto_real)
+    proyeccion_final = presupuesto_disponible - (gasto_medio * meses_restantes)
+    return gasto_acumulado_real, presupuesto_disponible, gasto_medio, proyeccion_final
+
+
+def porcentaje_presupuesto_gastado(gasto_acumulado_real, presupuesto_anual_total):
+    return (gasto_acumulado_real / presupuesto_anual_total) * 100 if presupuesto_anual_total > 0 else 0
+
+
+# Indicador (gauge) del porcentaje del presupuesto gastado
+def figura_gauge(porcentaje_gastado):
+    return go.Figure(go.Indicator(
+        mode="gauge+number",  # Eliminar 'delta' para ocultar el valor diferencial
+        value=porcentaje_gastado,
+        number={'suffix': "%"},  # Agregar el signo de porcentaje al valor
+        gauge={
+            'axis': {'range': [0, 100]},
+            'bar': {'color': "green"},
+            'steps': [
+                {'range': [0, 66], 'color': "lightgreen"},
+                {'range': [66, 100], 'color': "yellow"},
+            ],
+            'threshold': {
+                'line': {'color': "red", 'width': 4},
+                'thickness': 0.75,
+                'value': 100
+            }
+        },
+        title={'text': ""}
+    ))
+
+
+# Tabla combinada de gasto real vs presupuestado por mes y su versión transpuesta para mostrar
+def tabla_real_vs_presupuesto(gasto_real, gasto_presupuestado):
+    combined_data = pd.merge(gasto_real, gasto_presupuestado, on=['Año', 'Mes'], how='outer').fillna(0)
+    combined_data['Diferencia'] = combined_data['Valor/mon.inf.'] - combined_data['Presupuesto']
+
+    # Ordenar las columnas de manera ascendente
+    combined_data = combined_data.sort_values(by=['Año', 'Mes'])
+
+    # Eliminar las columnas 'Año' y 'Mes' y definir el índice temporalmente como el periodo concatenado
+    combined_data['Mes_Año'] = combined_data.apply(lambda x: f"{x['Mes']}_{x['Año']}", axis=1)
+    combined_data_display = combined_data.drop(columns=['Año', 'Mes']).set_index('Mes_Año')
+
+    # Eliminar el nombre de las columnas
+    combined_data_display.columns.name = None
+
+    # Renombrar las columnas para claridad
+    combined_data_display = combined_data_display.rename(columns={
+        'Valor/mon.inf.': 'Gasto Real',
+        'Presupuesto': 'Presupuesto',
+        'Diferencia': 'Diferencia'
+    })
+    return combined_data, combined_data_display.T
+
+
+# Diferencia mensual y diferencial acumulado entre gasto real y presupuesto hasta el último mes con gasto real
+def figura_diferencial(combined_data):
+    ultimo_mes_real = combined_data[combined_data['Valor/mon.inf.'] > 0]['Mes'].max()
+    if pd.isna(ultimo_mes_real):
+        ultimo_mes_real = 0  # Sin meses con gasto real (p. ej. ningún año seleccionado): gráfico vacío
+
+    # Crear una copia del DataFrame filtrado para los meses con datos reales
+    combined_data_filtered = combined_data[combined_data['Mes'] <= ultimo_mes_real].copy()
+
+    # Asegurar que todos los meses hasta julio (o hasta el último mes con datos reales) están presentes en el eje X
+    todos_los_meses = pd.DataFrame({'Mes': range(1, ultimo_mes_real + 1), 'Año': '2024'})
+    combined_data_filtered = pd.merge(todos_los_meses, combined_data_filtered, on=['Año', 'Mes'], how='left').fillna(0)
+
+    # Calcular el diferencial acumulado correctamente sin incluir un periodo adicional
+    combined_data_filtered['Diferencial Acumulado'] = combined_data_filtered['Diferencia'].cumsum()
+
+    fig = go.Figure()
+
+    # Gráfica de barras para la diferencia mensual
+    fig.add_trace(go.Bar(
+        x=combined_data_filtered['Mes_Año'],
+        y=combined_data_filtered['Diferencia'],
+        name='Diferencia Mensual',
+        marker_color='blue'
+    ))
+
+    # Línea para el diferencial acumulado, sin desfasar
+    fig.add_trace(go.Scatter(
+        x=combined_data_filtered['Mes_Año'],
+        y=combined_data_filtered['Diferencial Acumulado'],
+        mode='lines+markers',
+        name='Diferencial Acumulado',
+        line=dict(color='red'),
+        marker=dict(size=8)
+    ))
+
+    # Configurar el eje Y centrado en 0
+    fig.update_layout(
+        yaxis=dict(
+            title='Diferencia (Real - Presupuestado)',
+            zeroline=True,
+            zerolinewidth=2,
+            zerolinecolor='black'
+        ),
+        xaxis_title='Mes y Año',
+        title='Diferencia mensual entre Gasto Real y Presupuesto',
+        barmode='overlay',
+        xaxis=dict(
+            tickmode='array',
+            tickvals=[f'{i}_2024' for i in range(1, 13)],  # Mostrar todos los meses del año
+            ticktext=MESES,
+        )
+    )
+    return fig
+
+
+# Página de Órdenes
+
+# Tabla de métricas por tipo de orden: cantidad, gasto y valor OT medio, con formato de miles
+def tabla_metricas_tipo_orden(tipo_orden_metrics):
+    # Calcular el valor OT medio
+    tipo_orden_metrics['valor_ot_media'] = tipo_orden_metrics['gasto'] / tipo_orden_metrics['cantidad_ordenes']
+
+    # Seleccionar columnas específicas y renombrarlas para la visualización
+    display = tipo_orden_metrics[['Clase de orden', 'cantidad_ordenes', 'gasto', 'valor_ot_media']]
+    display.columns = ['Tipo de orden', 'Cantidad de ordenes', 'Gasto', 'Valor OT media']
+
+    # Redondear valor_ot_media a 0 decimales y formatear las columnas "Gasto" y "Valor OT media"
+    display['Valor OT media'] = display['Valor OT media'].round(0).astype(int)
+    display['Gasto'] = display['Gasto'].apply(lambda x: f"{x:,.0f}")
+    display['Valor OT media'] = display['Valor OT media'].apply(lambda x: f"{x:,.0f}")
+    return display.reset_index(drop=True)
+
+
+# Columnas apiladas del gasto mensual por tipo de orden
+def figura_tipo_orden(gasto_mensual):
+    pivot = gasto_mensual.pivot(index='Mes', columns='Clase de orden', values='Valor/mon.inf.').fillna(0)
+    fig_columnas = go.Figure()
+
+    # Añadir las columnas apiladas por tipo de orden con los colores definidos
+    for column in pivot.columns:
+        if column != 'Presupuesto':
+            color = COLORES_OT.get(column, 'grey')  # Usar el color definido o 'grey' por defecto
+            fig_columnas.add_trace(go.Bar(x=pivot.index, y=pivot[column], name=column, marker_color=color))
+
+    fig_columnas.update_layout(barmode='stack', title='', xaxis_title='Mes', yaxis_title='Gasto', legend_title='Tipo de Orden')
+    return fig_columnas
+
+
+# Tabla de mayores gastos (con las columnas de su agrupación del explorador) y el monto con separador de miles
+def tabla_top_gastos(top, agrupacion='Ninguna'):
+    display = top[columnas_mayores(agrupacion)]
+    display['Valor/mon.inf.'] = display['Valor/mon.inf.'].apply(lambda x: f"{x:,.0f}")
+    return display.reset_index(drop=True)
+
+
+def porcentaje_gasto_con_ot(gasto_total, gasto_con_ot):
+    return (gasto_con_ot / gasto_total) * 100
+
+
+# Secciones de las páginas: cada una calcula por separado sus indicadores, tablas y figuras para unos filtros
+
+def _seccion(indicadores=None, tablas=None, figuras=None):
+    return {'indicadores': indicadores or {}, 'tablas': tablas or {}, 'figuras': figuras or {}}
+
+
+# Gasto: distribución por proceso de cada familia
+def seccion_tortas(consultas, years, procesos, familias):
+    filtros = (years, procesos, familias)
+    gasto_materiales = consultas.gasto_por_proceso(*filtros, 'Materiales')
+    gasto_servicios = consultas.gasto_por_proceso(*filtros, 'Servicios')
+    return _seccion(
+        tablas={'gasto_materiales': gasto_materiales, 'gasto_servicios': gasto_servicios},
+        figuras={
+            'torta_materiales': figura_torta(gasto_materiales, 'Materiales'),
+            'torta_servicios': figura_torta(gasto_servicios, 'Servicios'),
+        },
+    )
+
+
+# Gasto: gasto acumulado, proyecciones y gauge
+def seccion_indicadores(consultas, years, procesos, familias):
+    filtros = (years, procesos, familias)
+    gasto_real = consultas.gasto_real_mensual(*filtros)
+    gasto_presupuestado = consultas.presupuesto_mensual(*filtros)
+    presupuesto_anual_total = consultas.presupuesto_total(*filtros)
+
+    _, gasto_acumulado_presupuestado = gasto_acumulado(gasto_real, gasto_presupuestado)
+    gasto_acumulado_real, presupuesto_disponible, gasto_medio, proyeccion_final = proyeccion_anual(gasto_real, presupuesto_anual_total)
+    porcentaje_gastado = porcentaje_presupuesto_gastado(gasto_acumulado_real, presupuesto_anual_total)
+    return _seccion(
+        indicadores={
+            'gasto_acumulado_real': gasto_acumulado_real,
+            'gasto_acumulado_presupuestado': gasto_acumulado_presupuestado,
+            'presupuesto_anual_total': presupuesto_anual_total,
+            'presupuesto_disponible': presupuesto_disponible,
+            'gasto_medio': gasto_medio,
+            'proyeccion_final': proyeccion_final,
+            'porcentaje_gastado': porcentaje_gastado,
+        },
+        figuras={'gauge': figura_gauge(porcentaje_gastado)},
+    )
+
+
+# Gasto: tabla real vs presupuestado y análisis diferencial
+def seccion_detalle(consultas, years, procesos, familias):
+    filtros = (years, procesos, familias)
+    gasto_real = consultas.gasto_real_mensual(*filtros)
+    gasto_presupuestado = consultas.presupuesto_mensual(*filtros)
+    combined_data, combined_data_transposed = tabla_real_vs_presupuesto(gasto_real, gasto_presupuestado)
+    return _seccion(
+        tablas={'gasto_real': gasto_real, 'gasto_presupuestado': gasto_presupuestado, 'real_vs_presupuesto': combined_data_transposed},
+        figuras={'diferencial': figura_diferencial(combined_data)},
+    )
+
+
+# Órdenes: gasto mensual y métricas por tipo de orden
+def seccion_tipo_orden(consultas, years, procesos, familias):
+    filtros = (years, procesos, familias)
+    return _seccion(
+        tablas={'metricas_tipo_orden': tabla_metricas_tipo_orden(consultas.metricas_tipo_orden(*filtros))},
+        figuras={'tipo_orden': figura_tipo_orden(consultas.gasto_mensual_tipo_orden(*filtros))},
+    )
+
+
+# Órdenes: 5 mayores gastos del año y del último mes
+def seccion_top_gastos(consultas, years, procesos, familias):
+    filtros = (years, procesos, familias)
+    return _seccion(tablas={
+        'top_gastos': tabla_top_gastos(consultas.top_gastos(*filtros)),
+        'top_gastos_ultimo_mes': tabla_top_gastos(consultas.top_gastos(*filtros, ultimo_mes=True)),
+    })
+
+
+# Órdenes: porcentaje del gasto con OT
+def seccion_porcentaje_ot(consultas, years, procesos, familias):
+    gasto_total, gasto_con_ot = consultas.gasto_con_ot(years, procesos, familias)
+    return _seccion(indicadores={
+        'gasto_total': gasto_total,
+        'gasto_con_ot': gasto_con_ot,
+        'porcentaje_con_ot': porcentaje_gasto_con_ot(gasto_total, gasto_con_ot),
+    })
+
+
+SECCIONES = {
+    'gasto': {'tortas': seccion_tortas, 'indicadores': seccion_indicadores, 'detalle': seccion_detalle},
+    'ordenes': {'tipo_orden': seccion_tipo_orden, 'top_gastos': seccion_top_gastos, 'porcentaje_ot': seccion_porcentaje_ot},
+}
+
+
+# Página completa: todas sus secciones juntas
+def _reporte(pagina, consultas, years, procesos, familias):
+    reporte = _seccion()
+    for calcular in SECCIONES[pagina].values():
+        for parte, valores in calcular(consultas, years, procesos, familias).items():
+            reporte[parte].update(valores)
+    return reporte
+
+
+# Indicadores, tablas y figuras de la página de Gasto para unos filtros
+def reporte_gasto(consultas, years, procesos, familias):
+    return _reporte('gasto', consultas, years, procesos, familias)
+
+
+# Indicadores, tablas y figuras de la página de Órdenes para unos filtros
+def reporte_ordenes(consultas, years, procesos, familias):
+    return _reporte('ordenes', consultas, years, procesos, familias)
+
+
+REPORTES = {'gasto': reporte_gasto, 'ordenes': reporte_ordenes}
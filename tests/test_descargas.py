@@ -0,0 +1,43 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from pipeline.descargas import validadores
+from pipeline.particiones import version_fuentes
+
+
+# Servidor que rechaza HEAD con 405 y responde GET sin validadores: solo se sabe si cambió mirando el cuerpo
+@pytest.fixture
+def servidor():
+    estado = {'cuerpo': b'Ejercicio;Periodo\n2024;1\n'}
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_HEAD(self):
+            self.send_error(405)
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(estado['cuerpo'])))
+            self.end_headers()
+            self.wfile.write(estado['cuerpo'])
+
+        def log_message(self, *args):
+            pass
+
+    http = ThreadingHTTPServer(('127.0.0.1', 0), Manejador)
+    threading.Thread(target=http.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{http.server_address[1]}/Data_0824.csv', estado
+    http.shutdown()
+
+
+def test_head_rechazado_revalida_con_get(servidor, tmp_path, monkeypatch):
+    url, estado = servidor
+    monkeypatch.setattr('pipeline.descargas.DIRECTORIO_DESCARGAS', tmp_path)
+    antes = validadores(url)
+    assert antes['contenido'] and validadores(url) == antes
+    version = version_fuentes([url])
+
+    estado['cuerpo'] = b'Ejercicio;Periodo\n2024;1\n2024;2\n'
+    assert validadores(url)['contenido'] != antes['contenido']
+    assert version_fuentes([url]) != version
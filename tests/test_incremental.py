@@ -0,0 +1,61 @@
+import pytest
+
+from benchmarks.sintetico import a_csv, generar
+from pipeline.fuentes import ESQUEMAS, parsear_fuente
+from pipeline.incremental import ingerir, leer_estado, verificar
+
+
+# Fuentes sintéticas parseadas con sus esquemas, como las entrega `cargar_fuentes` ('Ejercicio' int16, 'Período' int8)
+@pytest.fixture(scope='module')
+def fuentes():
+    crudas = generar(3000, semilla=1)
+    return {nombre: parsear_fuente(a_csv(crudas[nombre]), ESQUEMAS.get(nombre)) for nombre in ('data0', 'ordenes', 'utec', 'ceco')}
+
+
+def _ingerir(data0, fuentes, directorio):
+    return ingerir(data0.copy(), fuentes['ordenes'], fuentes['utec'], fuentes['ceco'], directorio=directorio)
+
+
+def _verificar(data0, fuentes, directorio):
+    return verificar(data0.copy(), fuentes['ordenes'], fuentes['utec'], fuentes['ceco'], directorio=directorio)
+
+
+def test_reingerir_archivo_sin_cambios(fuentes, tmp_path):
+    assert fuentes['data0']['Ejercicio'].dtype == 'int16'
+    gasto, removidas, _, _ = _ingerir(fuentes['data0'], fuentes, tmp_path)
+    for _ in range(2):
+        otra_vez, otras_removidas, _, _ = _ingerir(fuentes['data0'], fuentes, tmp_path)
+        assert len(otra_vez) == len(gasto)
+        assert len(otras_removidas) == len(removidas)
+        assert otra_vez['Valor/mon.inf.'].sum() == pytest.approx(gasto['Valor/mon.inf.'].sum())
+    assert _verificar(fuentes['data0'], fuentes, tmp_path) == {}
+
+
+def test_meses_nuevos_al_final(fuentes, tmp_path):
+    data0 = fuentes['data0'].sort_values(['Ejercicio', 'Período'], kind='stable', ignore_index=True)
+    ultimos = (data0['Ejercicio'] == 2024) & (data0['Período'] >= 11)
+    _ingerir(data0[~ultimos].reset_index(drop=True), fuentes, tmp_path)
+    _ingerir(data0, fuentes, tmp_path)
+    assert leer_estado(tmp_path)[0]['ultima_ingesta']['modo'] == 'incremental'
+    assert _verificar(data0, fuentes, tmp_path) == {}
+
+
+def test_meses_nuevos_intercalados(fuentes, tmp_path):
+    # El archivo sintético no está ordenado por mes: las filas nuevas quedan repartidas entre las antiguas
+    data0 = fuentes['data0']
+    ultimos = (data0['Ejercicio'] == 2024) & (data0['Período'] >= 11)
+    _ingerir(data0[~ultimos].reset_index(drop=True), fuentes, tmp_path)
+    _ingerir(data0, fuentes, tmp_path)
+    assert leer_estado(tmp_path)[0]['ultima_ingesta']['modo'] == 'incremental'
+    assert _verificar(data0, fuentes, tmp_path) == {}
+
+
+def test_mes_corregido_con_las_mismas_filas(fuentes, tmp_path):
+    data0 = fuentes['data0']
+    _ingerir(data0, fuentes, tmp_path)
+    corregido = data0.copy()
+    en_mes = (corregido['Ejercicio'] == 2023) & (corregido['Período'] == 5)
+    corregido.loc[en_mes, 'Valor/mon.inf.'] *= 2
+    _ingerir(corregido, fuentes, tmp_path)
+    assert leer_estado(tmp_path)[0]['ultima_ingesta']['modo'] == 'completa'
+    assert _verificar(corregido, fuentes, tmp_path) == {}
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline.pares import eliminar_pares_opuestos, eliminar_pares_opuestos_iterativo
+
+
+# Gasto aleatorio con pocos grupos, montos y períodos, para que abunden los pares, los empates y las reversas sin pareja
+def _gasto(semilla, filas=400, grupos=6, montos=(1, 2, 3, 5)):
+    rng = np.random.default_rng(semilla)
+    return pd.DataFrame({
+        'Clase de coste': rng.integers(0, 2, filas),
+        'Centro de coste': rng.choice([f'C{i}' for i in range(grupos // 2)], filas),
+        'Período': rng.integers(1, 6, filas),
+        'Valor/mon.inf.': rng.choice(montos, filas) * rng.choice([1, -1], filas),
+    })
+
+
+# Mismas filas conservadas (en el mismo orden) y mismas filas eliminadas que la implementación fila a fila
+def _assert_paridad(data):
+    filtrado, removido = eliminar_pares_opuestos(data)
+    filtrado_ref, removido_ref = eliminar_pares_opuestos_iterativo(data)
+    assert list(filtrado.index) == list(filtrado_ref.index)
+    assert sorted(removido.index) == sorted(removido_ref.index)
+
+
+@pytest.mark.parametrize('semilla', range(20))
+def test_paridad_aleatoria(semilla):
+    _assert_paridad(_gasto(semilla))
+
+
+def test_paridad_con_ceros_y_claves_faltantes():
+    data = _gasto(0)
+    data.loc[::7, 'Valor/mon.inf.'] = 0
+    data['Centro de coste'] = data['Centro de coste'].astype(object)
+    data.loc[::11, 'Centro de coste'] = None
+    _assert_paridad(data)
+
+
+def test_entrada_vacia():
+    filtrado, removido = eliminar_pares_opuestos(_gasto(0, filas=0))
+    assert filtrado.empty and removido.empty
+    _assert_paridad(_gasto(0, filas=0))
+
+
+def test_claves_todas_faltantes():
+    data = _gasto(0, filas=50).astype({'Centro de coste': object})
+    data['Centro de coste'] = None
+    filtrado, removido = eliminar_pares_opuestos(data)
+    assert filtrado.empty and removido.empty
+    _assert_paridad(data)
+
+
+def test_montos_repetidos():
+    data = pd.DataFrame({
+        'Clase de coste': 1,
+        'Centro de coste': 'C0',
+        'Período': [1, 1, 1, 1, 2, 2, 2, 3, 3, 3],
+        'Valor/mon.inf.': [5, 5, 5, -5, -5, 5, -5, -5, -5, -5],
+    })
+    _assert_paridad(data)
+
+
+@pytest.mark.parametrize('semilla', range(5))
+def test_un_solo_grupo(semilla):
+    data = _gasto(semilla, filas=200).assign(**{'Clase de coste': 1, 'Centro de coste': 'C0'})
+    _assert_paridad(data)
@@ -0,0 +1,41 @@
+import pytest
+
+from benchmarks.sintetico import escribir
+from pipeline.cubo import ConsultasCubo
+from pipeline.datos import construir_datos
+from pipeline.fuentes import ubicaciones
+from pipeline.particiones import AlmacenParticiones, ConsultasParticionadas, escribir_particiones
+from pipeline.reportes import FAMILIAS
+
+
+# Particiones por año de 3000 filas sintéticas (2023 y 2024)
+@pytest.fixture
+def directorio(tmp_path, monkeypatch):
+    escribir(tmp_path / 'fuentes', 3000, semilla=1)
+    monkeypatch.setenv('BUDGET_MONITOR_DIR_DATOS', str(tmp_path / 'fuentes'))
+    monkeypatch.setattr('pipeline.snapshots.DIRECTORIO_SNAPSHOTS', tmp_path / 'snapshots')
+    escribir_particiones(construir_datos(*ubicaciones(), incremental=False), tmp_path / 'particiones')
+    return tmp_path / 'particiones'
+
+
+def _consultas(almacen):
+    return ConsultasParticionadas(almacen, lambda almacen, years: ConsultasCubo(almacen.cubo(years)))
+
+
+# Las consultas de cada selección cuentan en el tope de memoria de las particiones
+def test_selecciones_dentro_del_tope(directorio):
+    sin_tope = _consultas(AlmacenParticiones(directorio, max_bytes=2**40))
+    for years in ([2023], [2024], [2023, 2024]):
+        sin_tope.gasto_real_mensual(years, sin_tope.procesos, FAMILIAS)
+    tamaños = {clave: tamaño for clave, (_, tamaño) in sin_tope.almacen.cache._entradas.items()}
+    selecciones = {clave: tamaño for clave, tamaño in tamaños.items() if clave[0] == 'seleccion'}
+    assert len(selecciones) == 3 and all(selecciones.values())
+
+    # Con tope para una sola selección, las anteriores (y sus particiones) se desalojan
+    tope = max(selecciones.values()) + max(tamaño for clave, tamaño in tamaños.items() if clave[0] != 'seleccion')
+    consultas = _consultas(AlmacenParticiones(directorio, max_bytes=tope))
+    for years in ([2023], [2024], [2023, 2024], [2023]):
+        referencia = sin_tope.gasto_real_mensual(years, sin_tope.procesos, FAMILIAS)
+        assert len(referencia) and consultas.gasto_real_mensual(years, consultas.procesos, FAMILIAS).equals(referencia)
+        assert consultas.almacen.cache.bytes <= tope
+    assert consultas.almacen.cache.estadisticas()['entradas'] < len(tamaños)
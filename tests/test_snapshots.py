@@ -0,0 +1,30 @@
+import pandas as pd
+
+from pipeline.snapshots import cargar_con_snapshot, leer_snapshot, nombre_fuente
+
+
+def _parsear(contenido):
+    return pd.DataFrame({'valor': [float(x) for x in contenido.split(b';')], 'texto': 'a'})
+
+
+def test_nombre_fuente_sin_mes():
+    assert nombre_fuente('https://s3.amazonaws.com/Data_0824.csv') == nombre_fuente('/datos/Data_0924.csv') == 'Data'
+    assert nombre_fuente('Data_0824_2.csv') == 'Data_2'
+
+
+def test_lectura_sin_copias(tmp_path):
+    cargar_con_snapshot(b'1;2;3', _parsear, tmp_path, fuente='Data')
+    data = cargar_con_snapshot(b'1;2;3', _parsear, tmp_path, fuente='Data')
+    assert data['valor'].tolist() == [1.0, 2.0, 3.0]
+    # La columna numérica es una vista del archivo mapeado (de solo lectura), no una copia en el heap
+    assert not data['valor'].to_numpy().flags.writeable
+
+
+def test_conserva_los_ultimos_por_fuente(tmp_path):
+    for contenido in (b'1', b'2', b'3', b'4'):
+        cargar_con_snapshot(contenido, _parsear, tmp_path, fuente='Data')
+    cargar_con_snapshot(b'9', _parsear, tmp_path, fuente='Base_Ordenes')
+    assert len(list((tmp_path / 'Data').glob('*.arrow'))) == 2
+    assert len(list((tmp_path / 'Base_Ordenes').glob('*.arrow'))) == 1
+    assert cargar_con_snapshot(b'4', lambda contenido: None, tmp_path, fuente='Data')['valor'].tolist() == [4.0]
+    assert leer_snapshot('inexistente', tmp_path) is None